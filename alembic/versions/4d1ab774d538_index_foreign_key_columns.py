@@ -0,0 +1,50 @@
+"""Index unindexed foreign key columns
+
+Revision ID: 4d1ab774d538
+Revises: e63d79a7affd
+Create Date: 2026-10-15 12:10:32.694018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d1ab774d538'
+down_revision: Union[str, Sequence[str], None] = 'e63d79a7affd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Referencing columns with no index of their own (or only as the trailing
+# column of a composite primary key). Without them, deleting a contact,
+# mailing list or campaign makes PostgreSQL sequentially scan each child
+# table to check the foreign keys, and the per-contact/per-list lookups
+# scan too.
+# (index name, table, columns)
+INDEXES = [
+    ('idx_sms_queue_contact', 'sms_queue', ['contact_id']),
+    ('idx_messages_contact', 'messages', ['id_contact']),
+    ('idx_messages_liste', 'messages', ['id_liste']),
+    ('idx_contact_list_contacts_contact', 'contact_list_contacts', ['id_contact']),
+    ('idx_mailing_lists_campagne', 'mailing_lists', ['id_campagne']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""Index scheduled campaigns by start date
+
+Revision ID: 9229f0c2373d
+Revises: d7d4984a3e6f
+Create Date: 2026-10-15 14:12:41.308517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9229f0c2373d'
+down_revision: Union[str, Sequence[str], None] = 'd7d4984a3e6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # send_scheduled_campaigns runs every minute with "WHERE statut =
+    # 'scheduled' AND date_debut <= now()". Only the few campaigns still
+    # waiting to start are in this partial index, so the check stays a short
+    # range scan however many finished campaigns accumulate.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_campagnes_scheduled_start', 'campagnes', ['date_debut'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+            postgresql_where=sa.text("statut = 'scheduled'"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_campagnes_scheduled_start', table_name='campagnes', if_exists=True,
+            postgresql_concurrently=True,
+        )
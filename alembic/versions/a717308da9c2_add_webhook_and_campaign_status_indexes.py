@@ -0,0 +1,48 @@
+"""Add webhook lookup and campaign status indexes on messages
+
+Revision ID: a717308da9c2
+Revises: 4d1ab774d538
+Create Date: 2026-10-15 12:47:21.305816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a717308da9c2'
+down_revision: Union[str, Sequence[str], None] = '4d1ab774d538'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, unique, postgresql index options)
+INDEXES = [
+    # Every Twilio status callback looks its message up by SID. SIDs are
+    # unique per message; rows that were never handed to Twilio have none.
+    ('idx_messages_external_id', 'messages', ['external_message_id'], True,
+     {'postgresql_where': sa.text('external_message_id IS NOT NULL')}),
+    # Per-campaign status counts and cost totals (campaign status, cost
+    # analysis, dashboard comparisons) become index-only scans.
+    ('idx_messages_campaign_status', 'messages', ['id_campagne', 'statut_livraison'], False,
+     {'postgresql_include': ['cost']}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique, options in INDEXES:
+            op.create_index(
+                name, table, columns, unique=unique, if_not_exists=True,
+                postgresql_concurrently=True, **options,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
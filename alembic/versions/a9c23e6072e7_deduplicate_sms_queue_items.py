@@ -0,0 +1,82 @@
+"""Deduplicate sms_queue items
+
+Revision ID: a9c23e6072e7
+Revises: 9229f0c2373d
+Create Date: 2026-10-15 14:31:07.942615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c23e6072e7'
+down_revision: Union[str, Sequence[str], None] = '9229f0c2373d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DEDUP_BATCH_SIZE = 50000
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Pause campaign launches (the beat schedule and the launch endpoint) while
+    this runs: a duplicate queued between the cleanup and the end of the
+    index build makes CREATE UNIQUE INDEX CONCURRENTLY fail. Re-running the
+    upgrade afterwards cleans up again and rebuilds the index.
+    """
+    # A contact on several of a campaign's lists used to be queued once per
+    # list and charged for every copy. Keep one item per campaign, contact and
+    # message: the most advanced one (sent, then in flight), else the oldest.
+    # A row goes if another copy ranks ahead of it anywhere in the table, so
+    # each id range can be cleaned, and committed, on its own.
+    rank = "CASE {0}.status WHEN 'sent' THEN 0 WHEN 'processing' THEN 1 ELSE 2 END"
+    delete_batch = sa.text(
+        f"""
+        DELETE FROM sms_queue AS dup
+        WHERE dup.id >= :start AND dup.id < :end
+          AND EXISTS (
+              SELECT 1 FROM sms_queue AS kept
+              WHERE kept.campaign_id = dup.campaign_id
+                AND kept.contact_id = dup.contact_id
+                AND md5(kept.message_content) = md5(dup.message_content)
+                AND ({rank.format('kept')}, kept.id) < ({rank.format('dup')}, dup.id)
+          )
+        """
+    )
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        max_id = conn.scalar(sa.text("SELECT max(id) FROM sms_queue")) or 0
+        for start in range(0, max_id + 1, DEDUP_BATCH_SIZE):
+            conn.execute(delete_batch, {"start": start, "end": start + DEDUP_BATCH_SIZE})
+
+        # A failed concurrent build leaves an INVALID index behind, which
+        # if_not_exists would keep, and ON CONFLICT would never use.
+        invalid = conn.scalar(sa.text(
+            """
+            SELECT 1 FROM pg_index
+            WHERE indexrelid = to_regclass('ux_sms_queue_dedup') AND NOT indisvalid
+            """
+        ))
+        if invalid:
+            op.drop_index('ux_sms_queue_dedup', table_name='sms_queue', postgresql_concurrently=True)
+
+        # The message is hashed so the key stays small however long the text is.
+        op.create_index(
+            'ux_sms_queue_dedup', 'sms_queue',
+            ['campaign_id', 'contact_id', sa.text('md5(message_content)')],
+            unique=True, if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ux_sms_queue_dedup', table_name='sms_queue', if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,50 @@
+"""Maintain updated_at with BEFORE UPDATE triggers
+
+Revision ID: c6f9ab232591
+Revises: e60499f8a45e
+Create Date: 2026-10-15 11:26:53.840127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f9ab232591'
+down_revision: Union[str, Sequence[str], None] = 'e60499f8a45e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['agents', 'campagnes', 'contacts']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stamp updated_at in the database so every writer, including bulk
+    # UPDATEs and manual SQL, keeps it current without the application
+    # having to remember to set it.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_updated_at BEFORE UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION touch_updated_at()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_updated_at ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS touch_updated_at()")
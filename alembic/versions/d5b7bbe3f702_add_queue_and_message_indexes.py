@@ -0,0 +1,71 @@
+"""Add sms_queue and messages performance indexes
+
+Revision ID: d5b7bbe3f702
+Revises: 11952268b8d5
+Create Date: 2026-10-15 09:12:41.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b7bbe3f702'
+down_revision: Union[str, Sequence[str], None] = '11952268b8d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, postgresql index options)
+INDEXES = [
+    # The batch worker only ever reads pending rows, oldest first. A partial
+    # index keeps sent/failed history out of the index so it stays small and
+    # hot, and lets "WHERE status = 'pending' ORDER BY id LIMIT n" stop early.
+    ('idx_sms_queue_pending', 'sms_queue', ['id'],
+     {'postgresql_where': sa.text("status = 'pending'")}),
+    # retry_failed_messages only touches failed rows, a small slice of the
+    # table; a partial index keeps that scan off the sent history.
+    ('idx_sms_queue_failed', 'sms_queue', ['id'],
+     {'postgresql_where': sa.text("status = 'failed'")}),
+    ('idx_sms_queue_campaign', 'sms_queue', ['campaign_id'], {}),
+    # Per-campaign delivery timeline: filters on the campaign, groups by send
+    # date and counts statuses. Carrying the status in the index lets the
+    # query run as an index-only scan that already returns rows in date order.
+    # Its leading column also serves plain id_campagne lookups, so no separate
+    # single-column index is kept. statut_livraison is deliberately not
+    # indexed on its own: with five values it is never selective enough to
+    # pay for the extra write on every insert.
+    ('idx_messages_campaign_date', 'messages', ['id_campagne', 'date_envoi'],
+     {'postgresql_include': ['statut_livraison']}),
+    # messages is append-mostly and date_envoi grows with insertion order, so
+    # a BRIN index serves the analytics range scans at a fraction of the size
+    # of a btree.
+    ('idx_messages_date_envoi_brin', 'messages', ['date_envoi'],
+     {'postgresql_using': 'brin', 'postgresql_with': {'pages_per_range': 32}}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, and
+    # building the indexes concurrently keeps sms_queue and messages writable
+    # while they are being built.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True, **options,
+            )
+        # Refresh planner statistics so the new indexes are costed correctly
+        # straight after the deploy rather than after the next autovacuum.
+        for table in sorted({table for _, table, _, _ in INDEXES}):
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,55 @@
+"""Index pending sms_queue items by due time
+
+Revision ID: d7d4984a3e6f
+Revises: a717308da9c2
+Create Date: 2026-10-15 13:34:08.572190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7d4984a3e6f'
+down_revision: Union[str, Sequence[str], None] = 'a717308da9c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The worker claims "WHERE status = 'pending' AND scheduled_at <= now
+    # ORDER BY scheduled_at, id LIMIT n". Keyed on (scheduled_at, id), the
+    # partial index returns due rows already in claim order, so the scan stops
+    # at the limit instead of sorting every due row; retries pushed into the
+    # future sit past the range and are never read. It supersedes the
+    # id-only pending index.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_sms_queue_pending_due', 'sms_queue', ['scheduled_at', 'id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+            postgresql_where=PENDING,
+        )
+        op.drop_index(
+            'idx_sms_queue_pending', table_name='sms_queue', if_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_sms_queue_pending', 'sms_queue', ['id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+            postgresql_where=PENDING,
+        )
+        op.drop_index(
+            'idx_sms_queue_pending_due', table_name='sms_queue', if_exists=True,
+            postgresql_concurrently=True,
+        )
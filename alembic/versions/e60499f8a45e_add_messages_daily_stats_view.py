@@ -0,0 +1,45 @@
+"""Add mv_messages_daily_stats materialized view
+
+Revision ID: e60499f8a45e
+Revises: d5b7bbe3f702
+Create Date: 2026-10-15 10:04:17.208331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e60499f8a45e'
+down_revision: Union[str, Sequence[str], None] = 'd5b7bbe3f702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Daily per-status message aggregates for the dashboard. The view is
+    # refreshed periodically by the refresh_message_stats Celery task.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_messages_daily_stats AS
+        SELECT date_trunc('day', date_envoi) AS day,
+               statut_livraison,
+               count(*) AS message_count,
+               coalesce(sum(cost), 0) AS total_cost
+        FROM messages
+        GROUP BY 1, 2
+        """
+    )
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY requires a unique index.
+    op.create_index(
+        'idx_mv_messages_daily_stats_day_status', 'mv_messages_daily_stats',
+        ['day', 'statut_livraison'], unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_messages_daily_stats")
@@ -0,0 +1,48 @@
+"""Store activity_logs old/new values as JSONB
+
+Revision ID: e63d79a7affd
+Revises: c6f9ab232591
+Create Date: 2026-10-15 11:48:09.217654
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e63d79a7affd'
+down_revision: Union[str, Sequence[str], None] = 'c6f9ab232591'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = ['old_values', 'new_values']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # jsonb is stored pre-parsed, so reads skip re-parsing the text and the
+    # columns can be queried with jsonb operators and GIN indexes.
+    for column in COLUMNS:
+        op.alter_column(
+            'activity_logs', column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            existing_type=sa.JSON(),
+            existing_nullable=True,
+            postgresql_using=f'{column}::jsonb',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in COLUMNS:
+        op.alter_column(
+            'activity_logs', column,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            existing_nullable=True,
+            postgresql_using=f'{column}::json',
+        )
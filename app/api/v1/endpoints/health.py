@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hashlib
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import text
 from app.db.session import engine
 import redis
@@ -9,35 +12,23 @@ from datetime import datetime
 
 router = APIRouter()
 
-@router.get("/health", tags=["health"])
-async def health_check():
-    """
-    Comprehensive health check for all backend services
-    """
-    health_status = {
-        "timestamp": datetime.now().isoformat(),
-        "status": "healthy",
-        "services": {}
-    }
-    
-    # Check PostgreSQL
+def _check_postgresql() -> dict:
     try:
         with engine.connect() as connection:
             result = connection.execute(text("SELECT version()"))
             version = result.fetchone()[0]
-            health_status["services"]["postgresql"] = {
+            return {
                 "status": "healthy",
                 "version": version.split(' ')[1],
                 "database": os.getenv('DATABASE_URL', '').split('/')[-1] if '/' in os.getenv('DATABASE_URL', '') else 'unknown'
             }
     except Exception as e:
-        health_status["services"]["postgresql"] = {
+        return {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_status["status"] = "degraded"
-    
-    # Check Redis
+
+def _check_redis() -> dict:
     try:
         redis_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
         parsed = urlparse(redis_url)
@@ -51,47 +42,80 @@ async def health_check():
         r.ping()
         info = r.info()
         
-        health_status["services"]["redis"] = {
+        return {
             "status": "healthy",
             "version": info.get('redis_version'),
             "host": f"{parsed.hostname or 'localhost'}:{parsed.port or 6379}",
             "database": parsed.path[1:] if parsed.path else '0'
         }
     except Exception as e:
-        health_status["services"]["redis"] = {
+        return {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_status["status"] = "degraded"
-    
-    # Check Twilio
+
+def _check_twilio() -> dict:
     try:
         account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         phone_number = os.getenv('TWILIO_PHONE_NUMBER')
         
         if not all([account_sid, auth_token, phone_number]):
-            health_status["services"]["twilio"] = {
+            return {
                 "status": "misconfigured",
                 "error": "Missing configuration"
             }
-            health_status["status"] = "degraded"
-        else:
-            client = Client(account_sid, auth_token)
-            account = client.api.accounts(account_sid).fetch()
-            
-            health_status["services"]["twilio"] = {
-                "status": "healthy",
-                "account_sid": account_sid[:8] + "...",
-                "phone_number": phone_number,
-                "account_status": account.status
-            }
+
+        client = Client(account_sid, auth_token)
+        account = client.api.accounts(account_sid).fetch()
+        
+        return {
+            "status": "healthy",
+            "account_sid": account_sid[:8] + "...",
+            "phone_number": phone_number,
+            "account_status": account.status
+        }
     except Exception as e:
-        health_status["services"]["twilio"] = {
+        return {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_status["status"] = "degraded"
+
+def _health_etag(health_status: dict) -> str:
+    """
+    Derives an ETag from the fields that only change when a service changes
+    state, leaving out the timestamp and error text that make every body
+    unique.
+    """
+    fingerprint = health_status["status"] + "".join(
+        f"|{name}:{info['status']}" for name, info in sorted(health_status["services"].items())
+    )
+    return '"' + hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest() + '"'
+
+@router.get("/health", tags=["health"])
+async def health_check(request: Request, response: Response):
+    """
+    Comprehensive health check for all backend services.
+    Pollers that send back the ETag in If-None-Match get an empty 304 while
+    nothing has changed state.
+    """
+    health_status = {
+        "timestamp": datetime.now().isoformat(),
+        "status": "healthy",
+        "services": {}
+    }
+    
+    # The checks use blocking drivers (psycopg2, redis-py, the Twilio client).
+    # Run them in the threadpool, concurrently, so a slow dependency neither
+    # stalls the event loop nor serialises behind the other checks.
+    postgresql, redis_status, twilio = await asyncio.gather(
+        run_in_threadpool(_check_postgresql),
+        run_in_threadpool(_check_redis),
+        run_in_threadpool(_check_twilio),
+    )
+    health_status["services"]["postgresql"] = postgresql
+    health_status["services"]["redis"] = redis_status
+    health_status["services"]["twilio"] = twilio
     
     # Overall status
     unhealthy_services = [
@@ -102,6 +126,11 @@ async def health_check():
     if unhealthy_services:
         health_status["status"] = "degraded"
         health_status["unhealthy_services"] = unhealthy_services
+
+    etag = _health_etag(health_status)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
     return health_status
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -15,13 +15,16 @@ router = APIRouter()
 def read_messages(
     skip: int = 0,
     limit: int = 100,
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: Agent = Depends(get_current_user),
 ):
     """
-    Retrieve messages.
+    Retrieve messages, ordered by id.
+    Pass the last id_message of a page as `after_id` to fetch the next page
+    without the cost of a deep `skip`.
     """
-    messages = message_service.get_messages(db, skip=skip, limit=limit)
+    messages = message_service.get_messages(db, skip=skip, limit=limit, after_id=after_id)
     return messages
 
 
@@ -30,13 +33,17 @@ def read_messages_by_campaign(
     campaign_id: int,
     skip: int = 0,
     limit: int = 100,
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: Agent = Depends(get_current_user),
 ):
     """
-    Retrieve messages for a specific campaign.
+    Retrieve messages for a specific campaign, ordered by id.
+    Pass the last id_message of a page as `after_id` to fetch the next page.
     """
-    messages = message_service.get_messages_by_campaign(db, campaign_id=campaign_id, skip=skip, limit=limit)
+    messages = message_service.get_messages_by_campaign(
+        db, campaign_id=campaign_id, skip=skip, limit=limit, after_id=after_id
+    )
     return messages
 
 
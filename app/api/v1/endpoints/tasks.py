@@ -25,6 +25,7 @@ def retry_task(task_id: str, current_user: Agent = Depends(get_current_active_ad
     # For now, we can re-queue the generic retry task.
     from app.tasks.sms_tasks import retry_failed_messages
     retry_failed_messages.delay()
+    QueueService.invalidate_queue_status()
     return {"message": f"Retry signal sent for tasks. Check worker logs."}
 
 @router.get("/progress/{task_id}", summary="Get progress of a specific task")
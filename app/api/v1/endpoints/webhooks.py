@@ -1,43 +1,53 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from typing import Annotated
+from urllib.parse import parse_qsl
 
-from app.db.session import get_db
-from app.services.webhook_service import WebhookService
+from app.services.webhook_service import DELIVERY_STATUS_FIELDS, WebhookService
 
 router = APIRouter()
 
-async def validate_twilio_request(request: Request, db: Session = Depends(get_db)):
-    """Dependency to validate incoming Twilio webhooks."""
+async def validate_twilio_request(request: Request):
+    """
+    Dependency to validate incoming Twilio webhooks.
+    Validation needs no database session, so none is acquired for it.
+    """
     try:
         raw_body = await request.body()
-        webhook_service = WebhookService(db)
+        # Parse the form once; the signature covers the form parameters and
+        # the endpoint reads the same dict from request.state.
+        form_dict = dict(parse_qsl(raw_body.decode('utf-8'), keep_blank_values=True))
+        request.state.form_dict = form_dict
         # The URL passed to the validator must match what Twilio requested
         # including any query parameters.
-        webhook_service.validate_webhook_signature(request, raw_body)
+        WebhookService.validate_webhook_signature(request, form_dict)
     except HTTPException as e:
         raise e # Re-raise the validation exception
     except Exception as e:
         # Catch any other exceptions during validation
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error during webhook validation")
-    return raw_body
+    return form_dict
 
 
 @router.post("/sms/delivery", status_code=204)
 async def sms_delivery_webhook(
     request: Request,
-    db: Session = Depends(get_db),
-    # By using Annotated[bytes, Depends(validate_twilio_request)], we ensure validation runs first
-    # but we don't consume the body here, allowing FastAPI to still parse the form.
+    # Validation runs first and leaves the parsed form on request.state.
     _=Depends(validate_twilio_request),
 ):
     """
     Handle incoming SMS delivery status updates from Twilio.
     Twilio sends data as application/x-www-form-urlencoded.
+    The callback is acknowledged as soon as its signature is verified; the
+    database update is handed to a Celery worker.
     """
-    payload = await request.form()
+    from app.tasks.sms_tasks import process_delivery_status
+
+    payload = request.state.form_dict
 
-    webhook_service = WebhookService(db)
-    webhook_service.handle_delivery_status(payload._dict)
+    # Hand over only the fields the update reads, not a copy of the whole form.
+    fields = {name: payload.get(name) for name in DELIVERY_STATUS_FIELDS}
+    # Publishing to the broker is blocking I/O, so keep it off the event loop.
+    await run_in_threadpool(process_delivery_status.delay, fields)
 
     return
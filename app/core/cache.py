@@ -0,0 +1,70 @@
+import json
+import logging
+from typing import Any, Optional
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns a process-wide Redis client, created on first use.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+        )
+    return _client
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """
+    Returns the JSON value stored under `key`, or None on a miss.
+    Cache errors are logged and treated as a miss so callers fall back to
+    computing the value.
+    """
+    try:
+        raw = get_redis().get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for '{key}': {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int) -> None:
+    """
+    Stores `value` as JSON under `key` for `ttl` seconds.
+    """
+    try:
+        get_redis().setex(key, ttl, json.dumps(value, default=str))
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for '{key}': {e}")
+
+
+def cache_delete(key: str) -> None:
+    """
+    Invalidates `key`.
+    """
+    try:
+        get_redis().delete(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed for '{key}': {e}")
+
+
+def cache_add(key: str, ttl: int) -> bool:
+    """
+    Atomically marks `key` as seen for `ttl` seconds (SET NX).
+    Returns False if the key was already present. Cache errors are logged and
+    reported as a first sighting, so callers go on to do the work.
+    """
+    try:
+        return bool(get_redis().set(key, 1, nx=True, ex=ttl))
+    except redis.RedisError as e:
+        logger.warning(f"Cache add failed for '{key}': {e}")
+        return True
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 # Initialize the Celery application
@@ -25,8 +26,25 @@ celery_app.conf.update(
             'task': 'app.tasks.sms_tasks.send_scheduled_campaigns',
             'schedule': 60.0,
         },
+        'refresh-message-stats-every-5-minutes': {
+            'task': 'app.tasks.sms_tasks.refresh_message_stats',
+            'schedule': 300.0,
+        },
     },
 )
 
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    """
+    Drops pooled connections inherited from the parent when a prefork worker
+    process starts, so each child opens its own instead of sharing sockets.
+    """
+    from app.db.session import engine
+    # close=False leaves the parent's connections alone; the child just
+    # forgets them and starts with an empty pool.
+    engine.dispose(close=False)
+
+
 if __name__ == '__main__':
     celery_app.start()
@@ -5,6 +5,11 @@ from pathlib import Path
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
     DATABASE_URL: str
+    # Connection pool sizing (ignored for SQLite). Twilio delivers status
+    # callbacks in bursts, which exhaust SQLAlchemy's default 5 + 10 pool.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800
     JWT_SECRET_KEY: str
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     TWILIO_ACCOUNT_SID: str
@@ -14,6 +19,8 @@ class Settings(BaseSettings):
     # SMS Service Settings
     BASE_URL: str
     SMS_RATE_LIMIT: Optional[str] = None
+    # Upper bound on concurrent Twilio API calls made by one batch run.
+    SMS_SEND_CONCURRENCY: int = 10
 
     # Celery Settings
     CELERY_BROKER_URL: str
@@ -1,8 +1,25 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
 import json
 from datetime import datetime
 
+_listener = None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Flush whatever is still queued when the process exits.
+atexit.register(_stop_listener)
+
 class JsonFormatter(logging.Formatter):
     """
     Formats log records as JSON strings.
@@ -18,18 +35,47 @@ class JsonFormatter(logging.Formatter):
         }
         if record.exc_info:
             log_record['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Rendered before the record was queued (see _StructuredQueueHandler).
+            log_record['exc_info'] = record.exc_text
         return json.dumps(log_record)
 
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that queues records without pre-formatting them.
+
+    The stock prepare() formats the record and stores the result, traceback
+    included, in msg, so JsonFormatter would emit the traceback inside
+    "message". Here only the message arguments are merged, and the traceback
+    is rendered into exc_text, which JsonFormatter emits as "exc_info".
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Don't keep the traceback's frames alive while the record is queued.
+            record.exc_info = None
+        return record
+
 def setup_logging():
     """
     Configures the root logger for the application.
+    Records are handed to a queue and formatted and written by a background
+    listener thread, so logging calls on request paths never block on the
+    output stream.
     """
+    global _listener
+
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
     # Remove any existing handlers
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    _stop_listener()
 
     # Create a handler that writes to stdout
     handler = logging.StreamHandler(sys.stdout)
@@ -38,7 +84,10 @@ def setup_logging():
     formatter = JsonFormatter()
     handler.setFormatter(formatter)
 
-    logger.addHandler(handler)
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_StructuredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
     
     # Suppress the specific bcrypt warning from passlib
     logging.getLogger("passlib.handlers.bcrypt").setLevel(logging.ERROR)
@@ -0,0 +1,33 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TIMESTAMP
+
+
+class utcnow(FunctionElement):
+    """
+    The database's current time in UTC, without a time zone, for comparing
+    against the naive UTC TIMESTAMP columns.
+
+    Plain now() would be converted to the session's TimeZone setting, which
+    is only correct when that happens to be UTC.
+    """
+    type = TIMESTAMP()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # Still the transaction's start time, like now().
+    return "timezone('utc', now())"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has whole seconds, which would leave a row
+    # queued earlier in the same second unclaimable until the next one.
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
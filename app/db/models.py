@@ -12,6 +12,7 @@ from sqlalchemy import (
     CheckConstraint,
     Table
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base import Base
 from sqlalchemy.sql import func
@@ -30,6 +31,10 @@ contact_list_contacts = Table('contact_list_contacts', Base.metadata,
 
 class Agent(Base):
     __tablename__ = 'agents'
+    # Read server-generated timestamps back with RETURNING on INSERT/UPDATE
+    # instead of expiring them and reloading on the next access. On
+    # PostgreSQL, updated_at is also stamped by trg_*_updated_at.
+    __mapper_args__ = {"eager_defaults": True}
     id_agent = Column(Integer, primary_key=True)
     nom_agent = Column(String(100), nullable=False)
     identifiant = Column(String(100), unique=True, nullable=False)
@@ -57,6 +62,7 @@ class MessageTemplate(Base):
 
 class Campaign(Base):
     __tablename__ = 'campagnes'
+    __mapper_args__ = {"eager_defaults": True}
     id_campagne = Column(Integer, primary_key=True)
     nom_campagne = Column(String(100), nullable=False)
     date_debut = Column(TIMESTAMP, nullable=False)
@@ -88,6 +94,7 @@ class Campaign(Base):
 
 class Contact(Base):
     __tablename__ = 'contacts'
+    __mapper_args__ = {"eager_defaults": True}
     id_contact = Column(Integer, primary_key=True)
     nom = Column(String(100), nullable=False)
     prenom = Column(String(100), nullable=False)
@@ -178,8 +185,8 @@ class ActivityLog(Base):
     action = Column(String(100), nullable=False)
     table_affected = Column(String(50))
     record_id = Column(Integer)
-    old_values = Column(JSON)
-    new_values = Column(JSON)
+    old_values = Column(JSON().with_variant(JSONB(), 'postgresql'))
+    new_values = Column(JSON().with_variant(JSONB(), 'postgresql'))
     ip_address = Column(String(45))
     timestamp = Column(TIMESTAMP, default=func.now())
 
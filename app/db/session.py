@@ -1,9 +1,23 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine_options = {"pool_pre_ping": True}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    engine_options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        # Reuse the most recently returned connection so a burst is served by
+        # warm connections and idle ones can age out.
+        pool_use_lifo=True,
+    )
+
+engine = create_engine(settings.DATABASE_URL, **engine_options)
+# Keep loaded state after commit: services return the objects they just
+# wrote, and expiring them would cost a reload SELECT on the next access.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 def get_db():
     db = SessionLocal()
@@ -11,3 +25,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dialect-specific INSERT constructs, which add ON CONFLICT support.
+_dialect_inserts = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def dialect_insert(db, entity):
+    """
+    Returns an INSERT for `entity` from the session's dialect, so callers can
+    use on_conflict_do_update() / on_conflict_do_nothing().
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name not in _dialect_inserts:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on the '{dialect_name}' dialect.")
+    return _dialect_inserts[dialect_name](entity)
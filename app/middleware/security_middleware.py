@@ -10,7 +10,9 @@ async def rate_limiting_middleware(request: Request, call_next):
     Placeholder for a simple, in-memory rate limiting middleware.
     """
     client_ip = request.client.host
-    current_time = time.time()
+    # Only differences between timestamps are used, so take them from the
+    # monotonic clock, which wall-clock adjustments can't move.
+    current_time = time.monotonic()
 
     # Clean up old timestamps
     if client_ip in request_counts:
@@ -1,7 +1,7 @@
 # This service will handle complex analytics and business intelligence queries.
 from sqlalchemy.orm import Session
 
-from sqlalchemy import func, case
+from sqlalchemy import func, case, select, literal_column
 from typing import List
 from app.db.models import Campaign, Message
 
@@ -68,25 +68,13 @@ class AnalyticsService:
         Calculates the delivery timeline for a campaign.
         Interval can be 'day' or 'hour'.
         """
-        if interval == 'day':
-            date_func = func.date(Message.date_envoi)
-        elif interval == 'hour':
-            # This is a simplification; for real applications, a more robust
-            # timestamp truncation function would be used depending on the DB.
-            date_func = func.strftime('%Y-%m-%d %H:00:00', Message.date_envoi)
-        else:
+        if interval not in ('day', 'hour'):
             raise ValueError("Invalid interval specified. Use 'day' or 'hour'.")
 
-        timeline_query = (
-            self.db.query(
-                date_func.label("timestamp"),
-                func.sum(case((Message.statut_livraison == "delivered", 1), else_=0)).label("delivered_count"),
-                func.sum(case((Message.statut_livraison == "failed", 1), else_=0)).label("failed_count"),
-            )
-            .filter(Message.id_campagne == campaign_id)
-            .group_by("timestamp")
-            .order_by("timestamp")
-        )
+        if self.db.get_bind().dialect.name == "postgresql":
+            timeline_query = self._delivery_timeline_query_postgresql(campaign_id, interval)
+        else:
+            timeline_query = self._delivery_timeline_query_generic(campaign_id, interval)
 
         timeline_data = [
             {
@@ -94,11 +82,61 @@ class AnalyticsService:
                 "delivered_count": row.delivered_count,
                 "failed_count": row.failed_count,
             }
-            for row in timeline_query.all()
+            for row in self.db.execute(timeline_query).all()
         ]
 
         return {"timeline": timeline_data}
 
+    def _delivery_timeline_query_postgresql(self, campaign_id: int, interval: str):
+        """
+        Buckets with date_trunc and gap-fills with generate_series in a single
+        query, so every bucket between the first and last send is returned,
+        with zero counts where nothing was sent.
+        """
+        bucket = func.date_trunc(interval, Message.date_envoi)
+        counts = (
+            select(
+                bucket.label("bucket"),
+                func.sum(case((Message.statut_livraison == "delivered", 1), else_=0)).label("delivered_count"),
+                func.sum(case((Message.statut_livraison == "failed", 1), else_=0)).label("failed_count"),
+            )
+            .where(Message.id_campagne == campaign_id)
+            .group_by(bucket)
+            .cte("counts")
+        )
+        # `interval` is validated against a fixed set above.
+        step = literal_column(f"interval '1 {interval}'")
+        series = select(
+            func.generate_series(func.min(counts.c.bucket), func.max(counts.c.bucket), step).label("timestamp")
+        ).subquery("series")
+
+        return (
+            select(
+                series.c.timestamp,
+                func.coalesce(counts.c.delivered_count, 0).label("delivered_count"),
+                func.coalesce(counts.c.failed_count, 0).label("failed_count"),
+            )
+            .select_from(series.outerjoin(counts, counts.c.bucket == series.c.timestamp))
+            .order_by(series.c.timestamp)
+        )
+
+    def _delivery_timeline_query_generic(self, campaign_id: int, interval: str):
+        if interval == 'day':
+            date_func = func.date(Message.date_envoi)
+        else:
+            date_func = func.strftime('%Y-%m-%d %H:00:00', Message.date_envoi)
+
+        return (
+            select(
+                date_func.label("timestamp"),
+                func.sum(case((Message.statut_livraison == "delivered", 1), else_=0)).label("delivered_count"),
+                func.sum(case((Message.statut_livraison == "failed", 1), else_=0)).label("failed_count"),
+            )
+            .where(Message.id_campagne == campaign_id)
+            .group_by("timestamp")
+            .order_by("timestamp")
+        )
+
     def get_segment_performance(self, campaign_id: int) -> dict:
         """
         Analyzes message performance across different contact segments for a campaign.
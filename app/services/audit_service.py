@@ -9,9 +9,12 @@ class AuditService:
         action: str,
         table_affected: str = None,
         record_id: int = None,
+        commit: bool = True,
     ):
         """
         Creates a new activity log entry.
+        Pass commit=False to add the entry to the caller's transaction, so it
+        is committed together with the change it records.
         """
         log_entry = ActivityLog(
             user_id=user.id_agent,
@@ -22,7 +25,8 @@ class AuditService:
             # ip_address=request.client.host
         )
         db.add(log_entry)
-        db.commit()
+        if commit:
+            db.commit()
 
     @staticmethod
     def get_audit_logs(db: Session, skip: int = 0, limit: int = 100):
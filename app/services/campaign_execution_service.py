@@ -1,12 +1,16 @@
 import logging
 from datetime import datetime, timezone
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.models import Campaign, Contact, SMSQueue
+from app.db.models import Campaign, Contact, MailingList, SMSQueue, liste_contacts
+from app.db.session import dialect_insert
 from app.utils.phone_validator import validate_and_format_phone_number, InvalidPhoneNumberError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+LAUNCH_BATCH_SIZE = 1000
+
 class CampaignExecutionService:
     def __init__(self, db: Session):
         self.db = db
@@ -19,11 +23,45 @@ class CampaignExecutionService:
             email=contact.email or ''
         )
 
+    def _insert_queue_rows(self, queue_rows: list) -> int:
+        """
+        Writes the collected queue rows as one executemany INSERT (batched
+        into multi-row statements by the driver), empties the list and returns
+        how many rows were written.
+        """
+        if not queue_rows:
+            return 0
+        # ux_sms_queue_dedup allows one queue item per campaign, contact and
+        # message; a row already queued is skipped, not sent twice. Skipped
+        # rows return nothing, so the returned ids count what was queued
+        # (executemany rowcount counts the rows sent on psycopg2).
+        inserted = self.db.execute(
+            dialect_insert(self.db, SMSQueue).on_conflict_do_nothing().returning(SMSQueue.id),
+            queue_rows,
+        ).all()
+        queue_rows.clear()
+        return len(inserted)
+
+    def _wake_queue_worker(self) -> None:
+        """
+        Starts a batch run right away for newly queued messages instead of
+        leaving them until the next periodic tick. The periodic batch remains
+        the fallback, so a broker error here only delays sending.
+        """
+        from app.tasks.sms_tasks import process_sms_batch
+        try:
+            # Don't retry the publish: the launch request shouldn't wait on it.
+            process_sms_batch.apply_async(retry=False, ignore_result=True)
+        except Exception as e:
+            logger.warning(f"Could not trigger an immediate SMS batch run: {e}")
+
     def launch_campaign(self, campaign_id: int) -> dict:
         """
         Validates, launches, and queues messages for a campaign.
         """
-        campaign = self.db.query(Campaign).filter(Campaign.id_campagne == campaign_id).first()
+        # Lock the campaign for the launch, so two concurrent launches of the
+        # same campaign run one after the other and the second sees it active.
+        campaign = self.db.query(Campaign).filter(Campaign.id_campagne == campaign_id).with_for_update().first()
 
         if not campaign:
             logger.error(f"Launch failed: Campaign with ID {campaign_id} not found.")
@@ -42,32 +80,59 @@ class CampaignExecutionService:
         campaign.statut = 'active'
 
         message_template = campaign.template.contenu_modele
+        queue_rows = []
         queued_count = 0
+        # Every item queued by this launch is scheduled for the same instant.
+        scheduled_at = datetime.now(timezone.utc)
+
+        # Stream just the columns personalisation needs, across all of the
+        # campaign's lists, in chunks of LAUNCH_BATCH_SIZE rather than loading
+        # every list's contacts as ORM objects; queue rows are flushed at the
+        # same size, so memory stays bounded by the chunk, not the audience.
+        # DISTINCT sends once to a contact who is on several of the lists.
+        recipients = self.db.execute(
+            select(
+                Contact.id_contact,
+                Contact.nom,
+                Contact.prenom,
+                Contact.email,
+                Contact.numero_telephone,
+                Contact.statut_opt_in,
+            )
+            .join(liste_contacts, liste_contacts.c.id_contact == Contact.id_contact)
+            .join(MailingList, MailingList.id_liste == liste_contacts.c.id_liste)
+            .where(MailingList.id_campagne == campaign.id_campagne)
+            .distinct()
+            .order_by(Contact.id_contact)
+            .execution_options(yield_per=LAUNCH_BATCH_SIZE)
+        )
 
-        for mailing_list in campaign.mailing_lists:
-            for contact in mailing_list.contacts:
-                if not contact.statut_opt_in:
-                    logger.info(f"Skipping contact {contact.id_contact} (opted out).")
-                    continue
-
-                try:
-                    validate_and_format_phone_number(contact.numero_telephone)
-                    personalized_content = self._personalize_message(message_template, contact)
-                    new_queue_item = SMSQueue(
-                        campaign_id=campaign.id_campagne,
-                        contact_id=contact.id_contact,
-                        message_content=personalized_content,
-                        scheduled_at=datetime.now(timezone.utc),
-                        status='pending'
-                    )
-                    self.db.add(new_queue_item)
-                    queued_count += 1
-                except InvalidPhoneNumberError as e:
-                    logger.warning(f"Skipping contact {contact.id_contact} for campaign {campaign.id_campagne}: {e}")
+        for contact in recipients:
+            if not contact.statut_opt_in:
+                logger.info(f"Skipping contact {contact.id_contact} (opted out).")
+                continue
+
+            try:
+                validate_and_format_phone_number(contact.numero_telephone)
+                personalized_content = self._personalize_message(message_template, contact)
+                queue_rows.append({
+                    "campaign_id": campaign.id_campagne,
+                    "contact_id": contact.id_contact,
+                    "message_content": personalized_content,
+                    "scheduled_at": scheduled_at,
+                    "status": 'pending',
+                })
+            except InvalidPhoneNumberError as e:
+                logger.warning(f"Skipping contact {contact.id_contact} for campaign {campaign.id_campagne}: {e}")
+
+            if len(queue_rows) >= LAUNCH_BATCH_SIZE:
+                queued_count += self._insert_queue_rows(queue_rows)
+        queued_count += self._insert_queue_rows(queue_rows)
 
         if queued_count > 0:
             self.db.commit()
             logger.info(f"Successfully launched campaign {campaign.id_campagne} and queued {queued_count} messages.")
+            self._wake_queue_worker()
             return {"success": True, "message": "Campaign launched successfully.", "queued_count": queued_count}
         else:
             # If no contacts were valid, rollback the status change
@@ -6,7 +6,6 @@ def create_campaign(db: Session, campaign: CampaignCreate, agent_id: int):
     db_campaign = Campaign(**campaign.model_dump(), id_agent=agent_id)
     db.add(db_campaign)
     db.commit()
-    db.refresh(db_campaign)
     return db_campaign
 
 def get_campaign(db: Session, campaign_id: int):
@@ -21,7 +20,6 @@ def update_campaign(db: Session, campaign_id: int, campaign: CampaignUpdate):
         for key, value in campaign.model_dump().items():
             setattr(db_campaign, key, value)
         db.commit()
-        db.refresh(db_campaign)
     return db_campaign
 
 def delete_campaign(db: Session, campaign_id: int):
@@ -45,5 +43,4 @@ def pause_campaign(db: Session, campaign_id: int):
 
     db_campaign.statut = 'paused'
     db.commit()
-    db.refresh(db_campaign)
     return {"success": True, "campaign": db_campaign}
@@ -1,9 +1,10 @@
 import logging
 from datetime import datetime, timezone
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.db.models import ContactList, Contact
+from app.db.models import ContactList, Contact, contact_list_contacts
 from app.api.v1.schemas.contact_list import ContactListCreate, ContactListUpdate, ContactListStatistics
 
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +27,6 @@ class ContactListService:
         new_list = ContactList(**list_data.model_dump())
         self.db.add(new_list)
         self.db.commit()
-        self.db.refresh(new_list)
         return new_list
 
     def update_contact_list(self, list_id: int, list_data: ContactListUpdate) -> ContactList | None:
@@ -39,7 +39,6 @@ class ContactListService:
             setattr(db_list, key, value)
 
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
 
     def soft_delete_contact_list(self, list_id: int) -> ContactList | None:
@@ -49,7 +48,6 @@ class ContactListService:
 
         db_list.deleted_at = datetime.now(timezone.utc)
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
 
     def get_available_contacts_for_list(self, type_client: str, zone_geographique: str, skip: int = 0, limit: int = 100) -> List[Contact]:
@@ -79,7 +77,6 @@ class ContactListService:
                 db_list.contacts.append(contact)
 
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
 
     def remove_contacts_from_list(self, list_id: int, contact_ids: List[int]) -> ContactList | None:
@@ -92,23 +89,29 @@ class ContactListService:
         db_list.contacts = [contact for contact in db_list.contacts if contact.id_contact not in contact_ids]
 
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
 
     def get_contact_list_statistics(self) -> List[ContactListStatistics]:
         """Get statistics for all contact lists"""
-        lists = self.get_all_contact_lists()
-        statistics = []
-        
-        for contact_list in lists:
-            stats = ContactListStatistics(
-                id_contact_list=contact_list.id_contact_list,
-                nom_liste=contact_list.nom_liste,
-                type_client=contact_list.type_client,
-                zone_geographique=contact_list.zone_geographique,
-                total_contacts=len(contact_list.contacts),
-                created_at=contact_list.created_at
+        # Count memberships on the association table in one grouped query
+        # rather than loading every list's contacts to take len() of them.
+        rows = self.db.execute(
+            select(
+                ContactList.id_contact_list,
+                ContactList.nom_liste,
+                ContactList.type_client,
+                ContactList.zone_geographique,
+                func.count(contact_list_contacts.c.id_contact).label("total_contacts"),
+                ContactList.created_at,
             )
-            statistics.append(stats)
-        
-        return statistics
+            .outerjoin(
+                contact_list_contacts,
+                contact_list_contacts.c.id_contact_list == ContactList.id_contact_list,
+            )
+            .where(ContactList.deleted_at.is_(None))
+            .group_by(ContactList.id_contact_list)
+            .order_by(ContactList.id_contact_list)
+            .limit(100)
+        ).mappings().all()
+
+        return [ContactListStatistics(**row) for row in rows]
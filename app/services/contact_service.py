@@ -13,7 +13,6 @@ def create_contact(db: Session, contact: ContactCreate):
     db_contact = Contact(**contact.model_dump())
     db.add(db_contact)
     db.commit()
-    db.refresh(db_contact)
     return db_contact
 
 def get_contact(db: Session, contact_id: int):
@@ -50,7 +49,6 @@ def update_contact(db: Session, contact_id: int, contact: ContactUpdate):
         for key, value in contact.model_dump().items():
             setattr(db_contact, key, value)
         db.commit()
-        db.refresh(db_contact)
     return db_contact
 
 def delete_contact(db: Session, contact_id: int):
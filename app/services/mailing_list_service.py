@@ -1,9 +1,10 @@
 import logging
 from datetime import datetime, timezone
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.db.models import MailingList, Contact, MessageTemplate
+from app.db.models import MailingList, Contact, MessageTemplate, liste_contacts
 from app.api.v1.schemas.mailing_list import MailingListCreate, MailingListUpdate, ListStatistics, BulkFilter
 
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +27,6 @@ class MailingListService:
         new_list = MailingList(**list_data.model_dump())
         self.db.add(new_list)
         self.db.commit()
-        self.db.refresh(new_list)
         return new_list
 
     def update_list(self, list_id: int, list_data: MailingListUpdate) -> MailingList | None:
@@ -39,7 +39,6 @@ class MailingListService:
             setattr(db_list, key, value)
 
         self.db.commit()
-        self.db.refresh(db_list)
         return db_list
 
     def soft_delete_list(self, list_id: int) -> MailingList | None:
@@ -125,31 +124,48 @@ class MailingListService:
         if not db_list:
             return None
 
-        contacts = db_list.contacts
-        total_contacts = len(contacts)
-
-        if total_contacts == 0:
-            return ListStatistics(
-                total_contacts=0,
-                opt_in_contacts=0,
-                opt_out_contacts=0,
-                segments={},
-                zones={},
-                contact_types={}
+        # Count in the database, grouped by every dimension we report on, and
+        # only fold the handful of resulting groups in Python rather than
+        # loading every contact of the list.
+        groups = (
+            self.db.query(
+                Contact.statut_opt_in,
+                Contact.segment,
+                Contact.zone_geographique,
+                Contact.type_client,
+                func.count().label("contact_count"),
             )
+            .join(liste_contacts, liste_contacts.c.id_contact == Contact.id_contact)
+            .filter(liste_contacts.c.id_liste == list_id)
+            .group_by(
+                Contact.statut_opt_in,
+                Contact.segment,
+                Contact.zone_geographique,
+                Contact.type_client,
+            )
+            .all()
+        )
 
-        opt_in_contacts = sum(1 for c in contacts if c.statut_opt_in)
-        opt_out_contacts = total_contacts - opt_in_contacts
-
-        # Calculate segment and zone distributions
-        segment_counts = Counter(c.segment for c in contacts if c.segment)
-        zone_counts = Counter(c.zone_geographique for c in contacts if c.zone_geographique)
-        type_counts = Counter(c.type_client for c in contacts if c.type_client)
+        total_contacts = 0
+        opt_in_contacts = 0
+        segment_counts = Counter()
+        zone_counts = Counter()
+        type_counts = Counter()
+        for group in groups:
+            total_contacts += group.contact_count
+            if group.statut_opt_in:
+                opt_in_contacts += group.contact_count
+            if group.segment:
+                segment_counts[group.segment] += group.contact_count
+            if group.zone_geographique:
+                zone_counts[group.zone_geographique] += group.contact_count
+            if group.type_client:
+                type_counts[group.type_client] += group.contact_count
 
         return ListStatistics(
             total_contacts=total_contacts,
             opt_in_contacts=opt_in_contacts,
-            opt_out_contacts=opt_out_contacts,
+            opt_out_contacts=total_contacts - opt_in_contacts,
             segments=dict(segment_counts),
             zones=dict(zone_counts),
             contact_types=dict(type_counts)
@@ -1,14 +1,50 @@
+from typing import Optional
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.db.models import Message
 
+# Columns exposed by the message list endpoints. The list reads select just
+# these and return plain row mappings, skipping ORM hydration and the identity
+# map for what are read-only, potentially large result sets.
+MESSAGE_LIST_COLUMNS = (
+    Message.id_message,
+    Message.contenu,
+    Message.date_envoi,
+    Message.statut_livraison,
+    Message.identifiant_expediteur,
+    Message.external_message_id,
+    Message.error_message,
+    Message.cost,
+    Message.id_liste,
+    Message.id_contact,
+    Message.id_campagne,
+    Message.created_at,
+)
+
 def get_message(db: Session, message_id: int):
     return db.query(Message).filter(Message.id_message == message_id).first()
 
-def get_messages(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Message).offset(skip).limit(limit).all()
+def _paginate(stmt, skip: int, limit: int, after_id: Optional[int]):
+    """
+    Orders a message list by id and pages it. When `after_id` is given the
+    page is fetched with a keyset seek (id_message > after_id), which reads
+    only `limit` rows however deep the client has paged; otherwise falls back
+    to OFFSET.
+    """
+    stmt = stmt.order_by(Message.id_message)
+    if after_id is not None:
+        return stmt.where(Message.id_message > after_id).limit(limit)
+    return stmt.offset(skip).limit(limit)
+
+def get_messages(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = _paginate(select(*MESSAGE_LIST_COLUMNS), skip, limit, after_id)
+    return db.execute(stmt).mappings().all()
 
-def get_messages_by_campaign(db: Session, campaign_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Message).filter(Message.id_campagne == campaign_id).offset(skip).limit(limit).all()
+def get_messages_by_campaign(db: Session, campaign_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = select(*MESSAGE_LIST_COLUMNS).where(Message.id_campagne == campaign_id)
+    stmt = _paginate(stmt, skip, limit, after_id)
+    return db.execute(stmt).mappings().all()
 
 def resend_message(db: Session, message_id: int):
     # In a real application, this would trigger a call to the SMS provider.
@@ -17,6 +53,5 @@ def resend_message(db: Session, message_id: int):
     if db_message:
         db_message.statut_livraison = "pending"
         db.commit()
-        db.refresh(db_message)
         return db_message
     return None
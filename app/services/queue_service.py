@@ -1,6 +1,119 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, case, delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_get, cache_set, cache_delete
 from app.core.celery_app import celery_app
+from app.db.functions import utcnow
+from app.db.models import Contact, SMSQueue
 from celery.result import AsyncResult
 
+QUEUE_STATUS_CACHE_KEY = "queue:status:v1"
+QUEUE_STATUS_CACHE_TTL = 3  # seconds
+
+MAX_SEND_ATTEMPTS = 3
+# A failed send is retried after a random delay of up to
+# RETRY_BASE_DELAY * 2**attempts.
+RETRY_BASE_DELAY = timedelta(minutes=1)
+CLEANUP_BATCH_SIZE = 5000
+
+# The worker runs the same few statements on every batch, so they are built
+# once here with bind parameters instead of on every call. They use the Core
+# table, so a list of parameter sets runs as a single executemany.
+sms_queue = SMSQueue.__table__
+contacts = Contact.__table__
+
+_claimable_ids = (
+    select(sms_queue.c.id)
+    .where(
+        sms_queue.c.status == 'pending',
+        # Evaluated by the database, so the claim's parameters never change
+        # from call to call.
+        sms_queue.c.scheduled_at <= utcnow(),
+    )
+    # Matches idx_sms_queue_pending_due, so the scan stops at the limit.
+    .order_by(sms_queue.c.scheduled_at, sms_queue.c.id)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+    .scalar_subquery()
+)
+# Each claimed row comes back with its recipient's number, read by a
+# correlated primary-key lookup, so the sender needs no separate contact query.
+# (SQLite doesn't allow RETURNING to read a joined UPDATE ... FROM table.)
+_recipient_number = (
+    select(contacts.c.numero_telephone)
+    .where(contacts.c.id_contact == sms_queue.c.contact_id)
+    .scalar_subquery()
+    .label("numero_telephone")
+)
+CLAIM_PENDING = (
+    update(sms_queue)
+    .where(sms_queue.c.id.in_(_claimable_ids))
+    .values(status='processing')
+    .returning(
+        sms_queue.c.id,
+        sms_queue.c.campaign_id,
+        sms_queue.c.contact_id,
+        _recipient_number,
+        sms_queue.c.message_content,
+        sms_queue.c.scheduled_at,
+    )
+)
+
+MARK_SENT = (
+    update(sms_queue)
+    .where(sms_queue.c.id == bindparam("item_id"))
+    .values(status='sent', processed_at=bindparam("processed_at"))
+)
+
+_next_attempts = sms_queue.c.attempts + 1
+MARK_FAILED_FINAL = (
+    update(sms_queue)
+    .where(sms_queue.c.id == bindparam("item_id"))
+    .values(attempts=_next_attempts, error_message=bindparam("error"), status='failed')
+)
+# The retry time for each attempt count is bound per call as retry_at_<n>,
+# so the statement stays a plain CASE on every database.
+MARK_FAILED_RETRY = (
+    update(sms_queue)
+    .where(sms_queue.c.id == bindparam("item_id"))
+    .values(
+        attempts=_next_attempts,
+        error_message=bindparam("error"),
+        status=case((_next_attempts >= MAX_SEND_ATTEMPTS, 'failed'), else_='pending'),
+        scheduled_at=case(
+            {
+                n: bindparam(f"retry_at_{n}", type_=sms_queue.c.scheduled_at.type)
+                for n in range(MAX_SEND_ATTEMPTS - 1)
+            },
+            value=sms_queue.c.attempts,
+            else_=sms_queue.c.scheduled_at,
+        ),
+    )
+)
+
+# Puts an item that was never attempted back in the queue for later without
+# counting an attempt against it.
+DEFER_PENDING = (
+    update(sms_queue)
+    .where(sms_queue.c.id == bindparam("item_id"))
+    .values(status='pending', error_message=bindparam("error"), scheduled_at=bindparam("retry_at"))
+)
+
+_expired_ids = (
+    select(sms_queue.c.id)
+    .where(
+        sms_queue.c.created_at < bindparam("cutoff"),
+        sms_queue.c.status.in_(['sent', 'failed']),
+    )
+    .order_by(sms_queue.c.id)
+    .limit(CLEANUP_BATCH_SIZE)
+    .scalar_subquery()
+)
+DELETE_EXPIRED_BATCH = delete(sms_queue).where(sms_queue.c.id.in_(_expired_ids))
+
 class QueueService:
     @staticmethod
     def enqueue_sms_batch(campaign_id: int):
@@ -20,16 +133,26 @@ class QueueService:
         """
         Gets statistics about the queue and workers.
         Requires Celery monitoring to be enabled (e.g., using Flower).
+
+        Each inspect call is a broadcast that waits on every worker, so the
+        result is cached in Redis for a few seconds to keep polling dashboards
+        and probes from hammering the broker.
         """
+        cached = cache_get(QUEUE_STATUS_CACHE_KEY)
+        if cached is not None:
+            return cached
+
         inspector = celery_app.control.inspect()
         stats = inspector.stats()
         active = inspector.active()
         scheduled = inspector.scheduled()
-        return {
+        status = {
             "stats": stats,
             "active_tasks": active,
             "scheduled_tasks": scheduled,
         }
+        cache_set(QUEUE_STATUS_CACHE_KEY, status, QUEUE_STATUS_CACHE_TTL)
+        return status
 
     @staticmethod
     def cancel_queued_jobs(task_id: str):
@@ -37,6 +160,14 @@ class QueueService:
         Cancels a specific task in the queue.
         """
         celery_app.control.revoke(task_id, terminate=True)
+        QueueService.invalidate_queue_status()
+
+    @staticmethod
+    def invalidate_queue_status():
+        """
+        Drops the cached queue status so the next read reflects a change.
+        """
+        cache_delete(QUEUE_STATUS_CACHE_KEY)
 
     @staticmethod
     def get_job_progress(task_id: str):
@@ -50,3 +181,99 @@ class QueueService:
             "status": result.status,
             "info": result.info, # Custom state information
         }
+
+
+class SMSQueueService:
+    """
+    Worker-side operations on the sms_queue table.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim_pending(self, limit: int):
+        """
+        Atomically claims up to `limit` pending items that are due, marking
+        them 'processing', and returns (id, campaign_id, contact_id,
+        numero_telephone, message_content, scheduled_at) rows for them.
+
+        The claim is a single UPDATE ... WHERE id IN (SELECT ... FOR UPDATE
+        SKIP LOCKED) RETURNING: concurrent workers step over rows another
+        worker is claiming instead of blocking on them or claiming them twice.
+        Only the columns the sender reads come back, as plain rows rather than
+        ORM objects. The caller commits.
+        """
+        items = self.db.execute(CLAIM_PENDING, {"limit": limit}).all()
+        # RETURNING order is unspecified; send in claim order.
+        return sorted(items, key=lambda item: (item.scheduled_at, item.id))
+
+    def mark_sent(self, sent: list[dict]):
+        """
+        Marks queue items sent. `sent` holds {"item_id", "processed_at"}
+        entries; they are written as one executemany UPDATE.
+        The caller commits.
+        """
+        if sent:
+            self.db.execute(MARK_SENT, sent)
+
+    def mark_failed(self, failures: list[dict], retryable: bool = True):
+        """
+        Records failed send attempts. `failures` holds {"item_id", "error"}
+        entries; they are written as one executemany UPDATE.
+        A retryable failure goes back to 'pending', rescheduled with exponential
+        backoff, until MAX_SEND_ATTEMPTS is reached; any other failure is final.
+        The caller commits.
+        """
+        if not failures:
+            return
+        if not retryable:
+            self.db.execute(MARK_FAILED_FINAL, failures)
+            return
+
+        # Full jitter: each item waits a random time within its backoff
+        # window, so a burst of failures (e.g. a provider outage) is retried
+        # spread out rather than all at once.
+        now = datetime.now(timezone.utc)
+        params = [
+            {
+                **failure,
+                **{
+                    f"retry_at_{n}": now + RETRY_BASE_DELAY * 2 ** (n + 1) * random.random()
+                    for n in range(MAX_SEND_ATTEMPTS - 1)
+                },
+            }
+            for failure in failures
+        ]
+        self.db.execute(MARK_FAILED_RETRY, params)
+
+    def defer(self, deferred: list[dict], delay: timedelta):
+        """
+        Returns claimed items that were never sent to 'pending' without
+        touching their attempts. `deferred` holds {"item_id", "error"} entries;
+        each item becomes due again after between one and two times `delay`,
+        spread out so they don't all come back at once.
+        The caller commits.
+        """
+        if not deferred:
+            return
+        now = datetime.now(timezone.utc)
+        self.db.execute(
+            DEFER_PENDING,
+            [{**item, "retry_at": now + delay * (1 + random.random())} for item in deferred],
+        )
+
+    def cleanup_old_records(self, days: int) -> int:
+        """
+        Deletes processed (sent or failed) items created more than `days` ago
+        and returns how many were removed.
+        Rows are removed in bounded batches, each committed on its own, so the
+        cleanup never holds long locks or builds one huge transaction against
+        the table the batch worker is writing to.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        total_deleted = 0
+        while True:
+            deleted = self.db.execute(DELETE_EXPIRED_BATCH, {"cutoff": cutoff}).rowcount
+            self.db.commit()
+            total_deleted += deleted
+            if deleted < CLEANUP_BATCH_SIZE:
+                return total_deleted
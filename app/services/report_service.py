@@ -1,30 +1,72 @@
 import io
 import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func, case, select, table, column
+from app.core.cache import cache_get, cache_set
 from app.db.models import CampaignReport, Campaign, Contact, Message
+from app.db.session import dialect_insert
+
+# Dashboards poll these totals every few seconds; a short shared cache absorbs
+# the polling without noticeably delaying the figures.
+DASHBOARD_STATS_CACHE_KEY = "reports:dashboard:v1"
+DASHBOARD_STATS_CACHE_TTL = 10  # seconds
+
+# Daily per-status message aggregates, maintained on PostgreSQL by the
+# e60499f8a45e migration and refreshed by the refresh_message_stats task.
+messages_daily_stats = table(
+    "mv_messages_daily_stats",
+    column("day"),
+    column("statut_livraison"),
+    column("message_count"),
+    column("total_cost"),
+)
 
 def get_campaign_report(db: Session, campaign_id: int):
     return db.query(CampaignReport).filter(CampaignReport.id_campagne == campaign_id).first()
 
 def get_dashboard_stats(db: Session):
-    total_campaigns = db.query(func.count(Campaign.id_campagne)).scalar()
-    total_contacts = db.query(func.count(Contact.id_contact)).scalar()
+    cached = cache_get(DASHBOARD_STATS_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    # Fetch every dashboard figure in a single round-trip: the campaign and
+    # contact totals ride along as scalar subqueries of the message aggregate.
+    total_campaigns = select(func.count(Campaign.id_campagne)).scalar_subquery()
+    total_contacts = select(func.count(Contact.id_contact)).scalar_subquery()
 
-    # Query message stats directly for real-time data
-    message_stats = db.query(
-        func.count(Message.id_message).label("total_sms_sent"),
-        func.sum(Message.cost).label("total_cost"),
-        func.sum(case((Message.statut_livraison == 'delivered', 1), else_=0)).label("delivered_count"),
-        func.sum(case((Message.statut_livraison == 'failed', 1), else_=0)).label("failed_count")
-    ).one()
+    if db.get_bind().dialect.name == "postgresql":
+        # Read the message totals from the precomputed daily view instead of
+        # aggregating the whole messages table on every dashboard hit. The
+        # figures lag by at most one refresh interval.
+        stats = messages_daily_stats.c
+        message_stats = db.query(
+            total_campaigns.label("total_campaigns"),
+            total_contacts.label("total_contacts"),
+            func.sum(stats.message_count).label("total_sms_sent"),
+            func.sum(stats.total_cost).label("total_cost"),
+            func.sum(case((stats.statut_livraison == 'delivered', stats.message_count), else_=0)).label("delivered_count"),
+            func.sum(case((stats.statut_livraison == 'failed', stats.message_count), else_=0)).label("failed_count")
+        ).select_from(messages_daily_stats).one()
+    else:
+        # Other backends (e.g. SQLite in tests) have no materialized view;
+        # aggregate the messages table directly.
+        message_stats = db.query(
+            total_campaigns.label("total_campaigns"),
+            total_contacts.label("total_contacts"),
+            func.count(Message.id_message).label("total_sms_sent"),
+            func.sum(Message.cost).label("total_cost"),
+            func.sum(case((Message.statut_livraison == 'delivered', 1), else_=0)).label("delivered_count"),
+            func.sum(case((Message.statut_livraison == 'failed', 1), else_=0)).label("failed_count")
+        ).select_from(Message).one()
 
+    total_campaigns = message_stats.total_campaigns or 0
+    total_contacts = message_stats.total_contacts or 0
     total_sms_sent = message_stats.total_sms_sent or 0
     total_cost = message_stats.total_cost or 0
     delivered_count = message_stats.delivered_count or 0
     failed_count = message_stats.failed_count or 0
 
-    return {
+    dashboard = {
         "total_campaigns": total_campaigns,
         "total_contacts": total_contacts,
         "total_sms_sent": total_sms_sent,
@@ -33,6 +75,8 @@ def get_dashboard_stats(db: Session):
         "total_messages_delivered": delivered_count,
         "total_messages_failed": failed_count,
     }
+    cache_set(DASHBOARD_STATS_CACHE_KEY, dashboard, DASHBOARD_STATS_CACHE_TTL)
+    return dashboard
 
 def export_campaign_report(db: Session, campaign_id: int, format: str):
     report = get_campaign_report(db, campaign_id)
@@ -57,6 +101,36 @@ def export_campaign_report(db: Session, campaign_id: int, format: str):
     return None
 
 
+def refresh_campaign_reports(db: Session) -> int:
+    """
+    Recomputes the message totals of every campaign's report and returns how
+    many reports were written.
+
+    Runs as one INSERT ... SELECT ... GROUP BY id_campagne ON CONFLICT DO
+    UPDATE, so all campaigns are aggregated and saved in a single statement
+    instead of a stats query and a write per campaign. The caller commits.
+    """
+    totals = (
+        select(
+            Message.id_campagne,
+            func.count(Message.id_message).label("total_sent"),
+            func.sum(case((Message.statut_livraison == 'delivered', 1), else_=0)).label("total_delivered"),
+            func.sum(case((Message.statut_livraison == 'failed', 1), else_=0)).label("total_failed"),
+            func.coalesce(func.sum(Message.cost), 0).label("total_cost"),
+            func.now().label("last_updated"),
+        )
+        .group_by(Message.id_campagne)
+    )
+    columns = ["id_campagne", "total_sent", "total_delivered", "total_failed", "total_cost", "last_updated"]
+
+    stmt = dialect_insert(db, CampaignReport).from_select(columns, totals)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CampaignReport.id_campagne],
+        set_={name: stmt.excluded[name] for name in columns[1:]},
+    )
+    return db.execute(stmt).rowcount
+
+
 def get_campaign_status(db: Session, campaign_id: int) -> dict:
     """
     Calculates the real-time counts of messages in each status for a given campaign.
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for a while so a batch fails fast instead
+    of waiting out a timeout per message.
+
+    After `fail_threshold` consecutive failures the circuit opens and calls are
+    rejected with CircuitOpenError. Once `reset_timeout` seconds have passed, a
+    single trial call is let through (half-open): success closes the circuit,
+    failure opens it again. Safe to share between threads.
+
+    `is_failure` decides which exceptions count as the provider failing; the
+    others (e.g. a rejected recipient) show the provider is answering and
+    count as successes. By default every exception is a failure.
+    """
+
+    def __init__(
+        self,
+        fail_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        is_failure: Optional[Callable[[Exception], bool]] = None,
+    ):
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda exc: True)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Calls `func` through the breaker. Exceptions raised by `func` are
+        re-raised unchanged.
+        """
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Provider circuit is open; call skipped.")
+                self._state = HALF_OPEN
+            elif self._state == HALF_OPEN:
+                # A trial call is already in flight.
+                raise CircuitOpenError("Provider circuit is half-open; call skipped.")
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            if self.is_failure(exc):
+                self._record_failure()
+            else:
+                self._record_success()
+            raise
+        self._record_success()
+        return result
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.fail_threshold:
+                if self._state != OPEN:
+                    logger.warning(f"Opening provider circuit after {self._failures} consecutive failures.")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Provider circuit closed again.")
+            self._state = CLOSED
+            self._failures = 0
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    provider_name: str, is_failure: Optional[Callable[[Exception], bool]] = None
+) -> CircuitBreaker:
+    """
+    Returns the process-wide breaker for `provider_name`, so each provider
+    trips independently of the others. `is_failure` applies when the breaker
+    is first created.
+    """
+    with _breakers_lock:
+        if provider_name not in _breakers:
+            _breakers[provider_name] = CircuitBreaker(is_failure=is_failure)
+        return _breakers[provider_name]
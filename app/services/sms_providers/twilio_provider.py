@@ -1,5 +1,7 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+import requests
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
@@ -11,9 +13,45 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Twilio message statuses mapped onto the statuses allowed in messages.statut_livraison.
+TWILIO_STATUS_MAP = {
+    'accepted': 'sent',
+    'scheduled': 'sent',
+    'queued': 'sent',
+    'sending': 'sent',
+    'sent': 'sent',
+    'delivered': 'delivered',
+    'read': 'delivered',
+    'failed': 'failed',
+    'undelivered': 'failed',
+    'canceled': 'failed',
+}
+
+
+def map_twilio_status(twilio_status: str) -> str:
+    """Maps a Twilio message status onto our delivery status, defaulting to 'sent'."""
+    return TWILIO_STATUS_MAP.get(twilio_status, 'sent')
+
+
 class TwilioApiError(Exception):
-    """Custom exception for Twilio API errors."""
-    pass
+    """
+    Custom exception for Twilio API errors. `status` is the HTTP status Twilio
+    answered with, or None when no response was received.
+    """
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_twilio_outage(exc: Exception) -> bool:
+    """
+    Tells whether an error says Twilio itself is unhealthy (5xx, 429 or no
+    response at all) rather than rejecting one message, e.g. 21211 (invalid
+    'To' number) or 21610 (unsubscribed recipient), which are 4xx.
+    """
+    if not isinstance(exc, TwilioApiError):
+        return False
+    return exc.status is None or exc.status == 429 or exc.status >= 500
 
 
 class TwilioProvider(BaseSmsProvider):
@@ -54,7 +92,11 @@ class TwilioProvider(BaseSmsProvider):
             }
         except TwilioRestException as e:
             logger.error(f"Twilio API error while sending SMS to {to_number}: {e}")
-            raise TwilioApiError(f"Failed to send SMS via Twilio. Reason: {e}")
+            raise TwilioApiError(f"Failed to send SMS via Twilio. Reason: {e}", status=e.status)
+        except requests.RequestException as e:
+            # Connection errors and timeouts: Twilio never answered.
+            logger.error(f"Could not reach Twilio while sending SMS to {to_number}: {e}")
+            raise TwilioApiError(f"Failed to reach Twilio. Reason: {e}")
 
     def get_delivery_status(self, message_sid: str) -> Dict[str, Any]:
         """
@@ -6,7 +6,6 @@ def create_template(db: Session, template: TemplateCreate, agent_id: int):
     db_template = MessageTemplate(**template.model_dump(), created_by=agent_id)
     db.add(db_template)
     db.commit()
-    db.refresh(db_template)
     return db_template
 
 def get_template(db: Session, template_id: int):
@@ -21,7 +20,6 @@ def update_template(db: Session, template_id: int, template: TemplateUpdate):
         for key, value in template.model_dump().items():
             setattr(db_template, key, value)
         db.commit()
-        db.refresh(db_template)
     return db_template
 
 def delete_template(db: Session, template_id: int):
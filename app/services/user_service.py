@@ -12,10 +12,12 @@ def create_user(db: Session, user: UserCreate, current_admin: Agent):
         user_data['role'] = user_data['role'].lower()
     db_user = Agent(**user_data, mot_de_passe=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # Flush to get the new id, then commit the user and its audit entry in one
+    # transaction.
+    db.flush()
 
-    AuditService.log_activity(db, user=current_admin, action="create_user", table_affected="agents", record_id=db_user.id_agent)
+    AuditService.log_activity(db, user=current_admin, action="create_user", table_affected="agents", record_id=db_user.id_agent, commit=False)
+    db.commit()
 
     return db_user
 
@@ -39,7 +41,6 @@ def update_user(db: Session, user_id: int, user: UserUpdate):
             setattr(db_user, key, value)
 
         db.commit()
-        db.refresh(db_user)
     return db_user
 
 def delete_user(db: Session, user_id: int):
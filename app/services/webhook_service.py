@@ -1,40 +1,114 @@
+import logging
+
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from twilio.request_validator import RequestValidator
 from fastapi import Request, HTTPException
 
+from app.core.cache import cache_add, cache_delete
 from app.core.config import settings
 from app.db.models import Message
+from app.services.sms_providers.twilio_provider import map_twilio_status
+
+logger = logging.getLogger(__name__)
+
+# The callback fields handle_delivery_status reads; Twilio posts many more.
+DELIVERY_STATUS_FIELDS = ('MessageSid', 'MessageStatus', 'ErrorMessage', 'Price')
+
+# Twilio retries callbacks it doesn't see acknowledged in time, so the same
+# (SID, status) pair can arrive several times within a few minutes.
+DELIVERY_STATUS_DEDUP_TTL = 300  # seconds
+
+# Callbacks are applied by several workers, so they can land out of order; a
+# message in one of these statuses is never moved back to a non-final one.
+FINAL_DELIVERY_STATUSES = ('delivered', 'failed', 'bounced')
+
+# The validator only holds the auth token, so one instance serves every request.
+_request_validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+
 
 class WebhookService:
     def __init__(self, db: Session):
         self.db = db
-        self.validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
 
-    def validate_webhook_signature(self, request: Request, body: bytes):
-        """Validates the signature of an incoming Twilio webhook."""
+    @staticmethod
+    def validate_webhook_signature(request: Request, params: dict):
+        """
+        Validates the signature of an incoming Twilio webhook against its
+        already-parsed form parameters.
+        Needs no database session, so callers can validate before acquiring one.
+        """
         twilio_signature = request.headers.get('X-Twilio-Signature', '')
         # The URL must be the full URL requested by Twilio, including query parameters
         url = str(request.url)
 
-        if not self.validator.validate(url, body.decode('utf-8'), twilio_signature):
+        if not _request_validator.validate(url, params, twilio_signature):
             raise HTTPException(status_code=403, detail="Invalid Twilio signature.")
 
-    def handle_delivery_status(self, payload: dict):
-        """Processes a delivery status update from Twilio."""
+    @staticmethod
+    def _delivery_status_key(payload: dict) -> str:
+        return f"twilio:status:{payload.get('MessageSid')}:{payload.get('MessageStatus')}"
+
+    @staticmethod
+    def is_duplicate_delivery_status(payload: dict) -> bool:
+        """
+        Returns True if this (MessageSid, MessageStatus) callback was already
+        seen recently, recording it otherwise.
+        """
+        return not cache_add(WebhookService._delivery_status_key(payload), DELIVERY_STATUS_DEDUP_TTL)
+
+    @staticmethod
+    def forget_delivery_status(payload: dict) -> None:
+        """
+        Clears the record left by is_duplicate_delivery_status, so a callback
+        whose update failed is applied when Twilio sends it again.
+        """
+        cache_delete(WebhookService._delivery_status_key(payload))
+
+    def handle_delivery_status(self, payload: dict) -> int | None:
+        """
+        Processes a delivery status update from Twilio.
+        Applies the update with a single UPDATE ... RETURNING keyed on the
+        message SID, and returns the id of the message, or None if the
+        payload is incomplete or the SID is unknown. A non-final status that
+        arrives after a final one is ignored.
+        """
         message_sid = payload.get('MessageSid')
         message_status = payload.get('MessageStatus')
 
         if not message_sid or not message_status:
-            return
+            return None
+
+        values = {"statut_livraison": map_twilio_status(message_status)}
+        if values["statut_livraison"] == 'failed':
+            values["error_message"] = payload.get('ErrorMessage')
+        cost_str = payload.get('Price')
+        if cost_str:
+            try:
+                values["cost"] = abs(float(cost_str))
+            except ValueError:
+                logger.warning(f"Ignoring malformed Twilio price '{cost_str}' for SID {message_sid}.")
 
-        message = self.db.query(Message).filter(Message.external_message_id == message_sid).first()
+        stmt = update(Message).where(Message.external_message_id == message_sid)
+        is_final = values["statut_livraison"] in FINAL_DELIVERY_STATUSES
+        if not is_final:
+            stmt = stmt.where(Message.statut_livraison.notin_(FINAL_DELIVERY_STATUSES))
 
-        if message:
-            message.statut_livraison = message_status
-            if message_status == 'failed':
-                message.error_message = payload.get('ErrorMessage')
-            # Handle cost later if needed
-            self.db.commit()
+        message_id = self.db.execute(
+            stmt.values(**values)
+            .returning(Message.id_message)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        self.db.commit()
+        if message_id is None and not is_final:
+            # Nothing updated: either the SID is unknown or the message
+            # already has a final status, which this stale callback keeps.
+            message_id = self.db.scalar(
+                select(Message.id_message).where(Message.external_message_id == message_sid)
+            )
+            if message_id is not None:
+                logger.info(f"Ignoring stale Twilio status '{message_status}' for SID {message_sid}.")
+        return message_id
 
     def handle_incoming_sms(self, payload: dict):
         """Handles an incoming SMS reply."""
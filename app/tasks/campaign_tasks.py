@@ -3,9 +3,10 @@ from app.core.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
+from sqlalchemy import update
 from app.db.session import SessionLocal
+from app.db.functions import utcnow
 from app.db.models import Campaign
-from datetime import datetime, timezone
 
 @celery_app.task
 def auto_complete_campaigns():
@@ -15,16 +16,19 @@ def auto_complete_campaigns():
     logger.info("Running auto_complete_campaigns task...")
     db = SessionLocal()
     try:
-        campaigns_to_complete = db.query(Campaign).filter(
-            Campaign.date_fin < datetime.now(timezone.utc),
-            Campaign.statut.in_(['active', 'paused'])
-        ).all()
-
-        if campaigns_to_complete:
-            logger.info(f"Found {len(campaigns_to_complete)} campaigns to mark as completed.")
-            for campaign in campaigns_to_complete:
-                campaign.statut = 'completed'
-            db.commit()
+        completed_count = db.execute(
+            update(Campaign)
+            .where(
+                Campaign.date_fin < utcnow(),
+                Campaign.statut.in_(['active', 'paused'])
+            )
+            .values(statut='completed')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+        if completed_count:
+            logger.info(f"Marked {completed_count} campaigns as completed.")
     finally:
         db.close()
 
@@ -1,44 +1,125 @@
 import logging
-from datetime import datetime, timezone
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from celery import group
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
 from app.core.celery_app import celery_app
 from app.core.config import settings
-from app.db.models import SMSQueue, Message, Campaign
+from app.db.models import SMSQueue, Message, Campaign, MailingList
+from app.db.functions import utcnow
 from app.db.session import SessionLocal
 from app.services.campaign_execution_service import CampaignExecutionService
-from app.services.sms_providers.twilio_provider import TwilioProvider, TwilioApiError
+from app.services.queue_service import SMSQueueService
+from app.services.report_service import refresh_campaign_reports
+from app.services.webhook_service import WebhookService
+from app.services.sms_providers.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.services.sms_providers.twilio_provider import TwilioProvider, TwilioApiError, is_twilio_outage, map_twilio_status
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-MAX_SEND_ATTEMPTS = 3
+QUEUE_RETENTION_DAYS = 30
+RETRY_BATCH_SIZE = 1000
+# When retry_failed_messages itself errors, it retries after a random delay of
+# up to RETRY_TASK_BASE_DELAY * 2**retries seconds, capped at RETRY_TASK_MAX_DELAY.
+RETRY_TASK_BASE_DELAY = 60
+RETRY_TASK_MAX_DELAY = 3600
+# Message records are written when their batch finishes sending, so a status
+# callback can arrive before its SID is in the database. It is retried this
+# many times, this many seconds apart, before being dropped as unknown.
+UNKNOWN_SID_MAX_RETRIES = 5
+UNKNOWN_SID_RETRY_DELAY = 10
+
+DEFAULT_BATCH_SIZE = 100
+
+def _parse_batch_size() -> int:
+    """
+    Reads the batch size from SMS_RATE_LIMIT, falling back to the default
+    when it is unset or not a positive integer.
+    """
+    if not settings.SMS_RATE_LIMIT:
+        return DEFAULT_BATCH_SIZE
+    try:
+        parsed_limit = int(settings.SMS_RATE_LIMIT)
+    except (ValueError, TypeError):
+        logger.warning(f"Invalid SMS_RATE_LIMIT format: '{settings.SMS_RATE_LIMIT}'. Expected an integer. Falling back to default {DEFAULT_BATCH_SIZE}.")
+        return DEFAULT_BATCH_SIZE
+    if parsed_limit <= 0:
+        logger.warning(f"SMS_RATE_LIMIT must be a positive integer, but got '{settings.SMS_RATE_LIMIT}'. Falling back to default {DEFAULT_BATCH_SIZE}.")
+        return DEFAULT_BATCH_SIZE
+    return parsed_limit
+
+# Settings are fixed for the life of the worker, so the batch size is parsed
+# (and any misconfiguration logged) once at import, not on every batch run.
+SMS_BATCH_SIZE = _parse_batch_size()
+
+# Shared by every batch run in this worker process, so an outage is
+# remembered from one run to the next.
+# Only outages trip it: a recipient Twilio rejects says nothing about Twilio.
+twilio_circuit = get_circuit_breaker("twilio", is_failure=is_twilio_outage)
 
 @celery_app.task
 def send_scheduled_campaigns():
     """
     Checks for campaigns that are scheduled to be sent and launches them.
+    Each launch runs as its own task, so a batch of due campaigns is spread
+    across the workers instead of being launched one after another here.
     """
     db = SessionLocal()
-    campaign_execution_service = CampaignExecutionService(db)
     try:
-        scheduled_campaigns = db.query(Campaign).filter(
-            Campaign.statut == 'scheduled',
-            Campaign.date_debut <= datetime.now(timezone.utc)
+        # Only the ids are needed: each launch task loads its campaign itself.
+        # No lock is taken here; launch_campaign locks the campaign row and
+        # re-checks its status, so a campaign picked up twice launches once.
+        scheduled_campaign_ids = db.scalars(
+            select(Campaign.id_campagne)
+            .where(
+                Campaign.statut == 'scheduled',
+                Campaign.date_debut <= utcnow()
+            )
         ).all()
+    finally:
+        db.close()
 
-        if not scheduled_campaigns:
-            logger.info("No scheduled campaigns to launch.")
-            return
+    if not scheduled_campaign_ids:
+        logger.info("No scheduled campaigns to launch.")
+        return
 
-        logger.info(f"Found {len(scheduled_campaigns)} scheduled campaigns to launch.")
-        for campaign in scheduled_campaigns:
-            try:
-                logger.info(f"Auto-launching scheduled campaign {campaign.id_campagne}.")
-                campaign_execution_service.launch_campaign(campaign.id_campagne)
-            except Exception as e:
-                logger.error(f"Failed to auto-launch campaign {campaign.id_campagne}: {e}")
+    logger.info(f"Found {len(scheduled_campaign_ids)} scheduled campaigns to launch.")
+    group(launch_scheduled_campaign.s(campaign_id) for campaign_id in scheduled_campaign_ids).apply_async()
+
+@celery_app.task
+def launch_scheduled_campaign(campaign_id: int):
+    """
+    Launches one scheduled campaign.
+    """
+    db = SessionLocal()
+    try:
+        logger.info(f"Auto-launching scheduled campaign {campaign_id}.")
+        CampaignExecutionService(db).launch_campaign(campaign_id)
+    except Exception as e:
+        logger.error(f"Failed to auto-launch campaign {campaign_id}: {e}")
     finally:
         db.close()
 
+def _insert_messages_individually(db, messages: list, sent: list, final_failures: list) -> list:
+    """
+    Fallback for a failed batch insert: writes each message record in its own
+    savepoint so a bad row only fails its own queue item. Returns the sent
+    outcomes whose record was written; the rest are added to final_failures.
+    """
+    recorded = []
+    for message, outcome in zip(messages, sent):
+        try:
+            with db.begin_nested():
+                db.execute(insert(Message).values(**message))
+            recorded.append(outcome)
+        except SQLAlchemyError as e:
+            logger.error(f"Could not record message for queue item {outcome['item_id']}: {e}")
+            final_failures.append({"item_id": outcome["item_id"], "error": str(e)})
+    return recorded
+
 @celery_app.task
 def process_sms_batch():
     """
@@ -48,90 +129,111 @@ def process_sms_batch():
     provider = TwilioProvider()
 
     try:
-        # Determine batch size from settings, with a fallback default
-        DEFAULT_BATCH_SIZE = 100
-        batch_size = DEFAULT_BATCH_SIZE
-        if settings.SMS_RATE_LIMIT:
-            try:
-                parsed_limit = int(settings.SMS_RATE_LIMIT)
-                if parsed_limit > 0:
-                    batch_size = parsed_limit
-                else:
-                    logger.warning(f"SMS_RATE_LIMIT must be a positive integer, but got '{settings.SMS_RATE_LIMIT}'. Falling back to default {DEFAULT_BATCH_SIZE}.")
-            except (ValueError, TypeError):
-                logger.warning(f"Invalid SMS_RATE_LIMIT format: '{settings.SMS_RATE_LIMIT}'. Expected an integer. Falling back to default {DEFAULT_BATCH_SIZE}.")
-
-        # Atomically fetch and lock pending items for processing
-        pending_items_query = db.query(SMSQueue).filter(SMSQueue.status == 'pending').limit(batch_size)
-        pending_items = pending_items_query.all()
+        # Claim a batch in one round trip.
+        queue_service = SMSQueueService(db)
+        pending_items = queue_service.claim_pending(SMS_BATCH_SIZE)
+        db.commit()
 
         if not pending_items:
             # This is a normal state, so use info level, not warning
             # logger.info("No pending SMS messages to process.")
             return
 
-        item_ids = [item.id for item in pending_items]
-        db.query(SMSQueue).filter(SMSQueue.id.in_(item_ids)).update({"status": "processing"}, synchronize_session=False)
-        db.commit()
+        # Resolve each campaign's mailing list once (it doesn't change while
+        # the campaign is sending) instead of once per item.
+        mailing_list_ids = dict(db.execute(
+            select(MailingList.id_campagne, func.min(MailingList.id_liste))
+            .where(MailingList.id_campagne.in_({item.campaign_id for item in pending_items}))
+            .group_by(MailingList.id_campagne)
+        ).all())
 
         logger.info(f"Processing {len(pending_items)} messages from the queue.")
 
-        for item in pending_items:
-            try:
-                # Construct callback URL
-                callback_url = f"http://localhost:8000/api/v1/sms-webhooks/twilio-status" # Placeholder URL
+        # Message records and queue item outcomes are collected and written
+        # in one transaction after the loop instead of per message. `messages`
+        # and `sent` line up index for index.
+        messages = []
+        sent = []
+        retryable_failures = []
+        final_failures = []
+        deferred = []
+
+        # Construct callback URL
+        callback_url = f"http://localhost:8000/api/v1/sms-webhooks/twilio-status" # Placeholder URL
 
-                response = provider.send_sms(
-                    to_number=item.contact.numero_telephone,
+        # The Twilio calls are network-bound, so run up to SMS_SEND_CONCURRENCY
+        # of them at once. Only the provider call goes to the pool: the
+        # session isn't thread-safe, so results are recorded here, on the
+        # task's own thread, as each send completes.
+        with ThreadPoolExecutor(max_workers=max(1, settings.SMS_SEND_CONCURRENCY)) as executor:
+            futures = {
+                executor.submit(
+                    twilio_circuit.call,
+                    provider.send_sms,
+                    to_number=item.numero_telephone,
                     message=item.message_content,
-                    callback_url=callback_url
-                )
+                    callback_url=callback_url,
+                ): item
+                for item in pending_items
+            }
 
-                # Map Twilio's 'queued' status to our 'sent' status
-                message_status = response.get("status", "failed")
-                if message_status in ['queued', 'sending']:
-                    message_status = 'sent'
-
-                # Create permanent message record
-                new_message = Message(
-                    contenu=item.message_content,
-                    date_envoi=datetime.now(timezone.utc),
-                    statut_livraison=message_status,
-                    identifiant_expediteur=provider.twilio_phone_number,
-                    external_message_id=response.get("sid"),
-                    id_liste=item.campaign.mailing_lists[0].id_liste if item.campaign.mailing_lists else None,
-                    id_contact=item.contact_id,
-                    id_campagne=item.campaign_id
-                )
-                db.add(new_message)
-
-                # Update queue item
-                item.status = 'sent'
-                item.processed_at = datetime.now(timezone.utc)
-                logger.info(f"Successfully sent message from queue item {item.id}")
-
-            except TwilioApiError as e:
-                logger.error(f"Twilio API error for queue item {item.id}: {e}")
-                item.attempts += 1
-                item.error_message = str(e)
-                if item.attempts >= MAX_SEND_ATTEMPTS:
-                    item.status = 'failed'
-                else:
-                    item.status = 'pending' # Re-queue for another attempt
-
-            except Exception as e:
-                logger.error(f"Unexpected error processing queue item {item.id}: {e}")
-                item.attempts += 1
-                item.error_message = str(e)
-                item.status = 'failed'
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    response = future.result()
 
-            db.commit()
+                    # Map Twilio's status (usually 'queued') onto our delivery statuses
+                    message_status = map_twilio_status(response.get("status", "failed"))
+
+                    # Permanent message records are written together after the loop.
+                    now = datetime.now(timezone.utc)
+                    messages.append({
+                        "contenu": item.message_content,
+                        "date_envoi": now,
+                        "statut_livraison": message_status,
+                        "identifiant_expediteur": provider.twilio_phone_number,
+                        "external_message_id": response.get("sid"),
+                        "id_liste": mailing_list_ids.get(item.campaign_id),
+                        "id_contact": item.contact_id,
+                        "id_campagne": item.campaign_id,
+                    })
+                    sent.append({"item_id": item.id, "processed_at": now})
+                    logger.info(f"Successfully sent message from queue item {item.id}")
+
+                except TwilioApiError as e:
+                    logger.error(f"Twilio API error for queue item {item.id}: {e}")
+                    # Re-queue for another attempt until the limit is reached
+                    retryable_failures.append({"item_id": item.id, "error": str(e)})
+
+                except CircuitOpenError as e:
+                    # Twilio is failing and the item wasn't attempted: put it
+                    # back for after the circuit may close, without using up
+                    # one of its attempts.
+                    deferred.append({"item_id": item.id, "error": str(e)})
+
+                except Exception as e:
+                    logger.error(f"Unexpected error processing queue item {item.id}: {e}")
+                    final_failures.append({"item_id": item.id, "error": str(e)})
+
+        if messages:
+            try:
+                db.execute(insert(Message), messages)
+            except SQLAlchemyError as e:
+                logger.error(f"Batch insert of {len(messages)} message records failed, retrying row by row: {e}")
+                db.rollback()
+                sent = _insert_messages_individually(db, messages, sent, final_failures)
+
+        queue_service.mark_sent(sent)
+        queue_service.mark_failed(retryable_failures)
+        queue_service.mark_failed(final_failures, retryable=False)
+        queue_service.defer(deferred, timedelta(seconds=twilio_circuit.reset_timeout))
+        db.commit()
 
     finally:
         db.close()
 
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=300) # 5-minute delay
+@celery_app.task(bind=True, max_retries=3)
 def retry_failed_messages(self):
     """
     Scans for messages that have permanently failed and re-queues them for one final attempt.
@@ -139,33 +241,124 @@ def retry_failed_messages(self):
     """
     db = SessionLocal()
     try:
-        failed_items = db.query(SMSQueue).filter(SMSQueue.status == 'failed').all()
-        logger.info(f"Found {len(failed_items)} failed messages to retry.")
-        for item in failed_items:
-            logger.info(f"Re-queuing failed message {item.id} for campaign {item.campaign_id}.")
-            item.status = 'pending' # Reset status to be picked up by the batch processor
-            item.attempts = 0 # Reset attempts
-            item.error_message = f"Re-queued after failure at {datetime.now(timezone.utc)}"
-        db.commit()
+        # Walk the failed items in id order (served by idx_sms_queue_failed),
+        # re-queueing one bounded batch per transaction. The keyset cursor
+        # also keeps items that fail again while the task runs from being
+        # picked up a second time.
+        requeued_count = 0
+        last_id = 0
+        requeue_note = f"Re-queued after failure at {datetime.now(timezone.utc)}"
+        while True:
+            batch_ids = db.execute(
+                select(SMSQueue.id)
+                .where(SMSQueue.status == 'failed', SMSQueue.id > last_id)
+                .order_by(SMSQueue.id)
+                .limit(RETRY_BATCH_SIZE)
+            ).scalars().all()
+            if not batch_ids:
+                break
+            result = db.execute(
+                update(SMSQueue)
+                .where(SMSQueue.id.in_(batch_ids), SMSQueue.status == 'failed')
+                .values(
+                    status='pending', # Reset status to be picked up by the batch processor
+                    attempts=0, # Reset attempts
+                    error_message=requeue_note,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            requeued_count += result.rowcount
+            last_id = batch_ids[-1]
+            if len(batch_ids) < RETRY_BATCH_SIZE:
+                break
+        logger.info(f"Re-queued {requeued_count} failed messages for retry.")
     except Exception as exc:
         logger.error(f"Error during retry_failed_messages task: {exc}")
-        raise self.retry(exc=exc)
+        # Full jitter, so workers that failed together don't retry together.
+        backoff = min(RETRY_TASK_MAX_DELAY, RETRY_TASK_BASE_DELAY * 2 ** self.request.retries)
+        raise self.retry(exc=exc, countdown=random.uniform(0, backoff))
     finally:
         db.close()
 
 
 @celery_app.task
-def cleanup_old_messages():
+def cleanup_old_messages(days: int = QUEUE_RETENTION_DAYS):
+    """
+    Deletes processed (sent or failed) sms_queue items older than `days`.
+    """
+    db = SessionLocal()
+    try:
+        total_deleted = SMSQueueService(db).cleanup_old_records(days)
+        logger.info(f"Deleted {total_deleted} processed queue items older than {days} days.")
+    finally:
+        db.close()
+
+@celery_app.task
+def refresh_message_stats():
     """
-    Placeholder for a task to clean up old message records or queue items.
+    Refreshes the mv_messages_daily_stats materialized view backing the dashboard.
     """
-    logger.info("Running cleanup_old_messages task (placeholder)...")
-    pass
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        # CONCURRENTLY keeps the view readable while it is being rebuilt.
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_messages_daily_stats"))
+        db.commit()
+    finally:
+        db.close()
 
 @celery_app.task
 def generate_campaign_reports():
     """
-    Placeholder for a task to generate campaign analytics reports periodically.
+    Refreshes the delivery totals stored in every campaign's report.
     """
-    logger.info("Running generate_campaign_reports task (placeholder)...")
-    pass
+    db = SessionLocal()
+    try:
+        report_count = refresh_campaign_reports(db)
+        db.commit()
+        logger.info(f"Refreshed {report_count} campaign reports.")
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, max_retries=UNKNOWN_SID_MAX_RETRIES)
+def process_delivery_status(self, payload: dict):
+    """
+    Applies a Twilio delivery status callback to its 'messages' record.
+    The webhook endpoints only enqueue this task, so database work never runs
+    in the API process.
+    """
+    message_sid = payload.get("MessageSid")
+    message_status = payload.get("MessageStatus")
+
+    if not message_sid or not message_status:
+        logger.warning("Received a Twilio webhook with missing MessageSid or MessageStatus.")
+        return
+
+    if WebhookService.is_duplicate_delivery_status(payload):
+        logger.info(f"Ignoring repeated Twilio status update for SID {message_sid}: {message_status}")
+        return
+
+    db = SessionLocal()
+    try:
+        message_id = WebhookService(db).handle_delivery_status(payload)
+    except Exception:
+        # The callback was marked as seen before the update; unmark it so
+        # Twilio's next delivery of it isn't dropped as a repeat.
+        WebhookService.forget_delivery_status(payload)
+        raise
+    finally:
+        db.close()
+
+    if message_id is None:
+        # Let the retry, or a later delivery of the same callback, through.
+        WebhookService.forget_delivery_status(payload)
+        if self.request.retries < self.max_retries:
+            logger.info(f"Message SID {message_sid} not recorded yet; retrying its {message_status} status.")
+            raise self.retry(countdown=UNKNOWN_SID_RETRY_DELAY)
+        logger.warning(f"Webhook for unknown message SID {message_sid} received. Ignoring.")
+        return
+
+    logger.info(f"Updated message {message_id} (SID: {message_sid}) with Twilio status {message_status}")
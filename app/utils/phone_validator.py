@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
 import phonenumbers
 from phonenumbers.phonenumberutil import NumberParseException
 
@@ -5,6 +8,26 @@ class InvalidPhoneNumberError(ValueError):
     """Custom exception for invalid phone numbers."""
     pass
 
+# Separators that don't change the number: plain and non-breaking spaces,
+# tabs, dots and dashes (including en/em dashes from pasted spreadsheets).
+_SEPARATORS = str.maketrans('', '', ' .-\t\u00a0\u2013\u2014')
+
+# Contacts are re-validated every time a campaign targets them, so results are
+# memoised. Invalid numbers are cached too, as their error message: a contact
+# with a bad number is otherwise re-parsed and rejected on every launch.
+@lru_cache(maxsize=8192)
+def _parse_and_format(phone_number: str, country_code: str = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns (E.164 number, None) for a valid number, or (None, error message).
+    """
+    try:
+        parsed_number = phonenumbers.parse(phone_number, country_code)
+    except NumberParseException as e:
+        return None, f"Could not parse the phone number '{phone_number}'. Reason: {e}"
+    if not phonenumbers.is_valid_number(parsed_number):
+        return None, f"The phone number '{phone_number}' is not valid."
+    return phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164), None
+
 def validate_and_format_phone_number(phone_number: str, country_code: str = None) -> str:
     """
     Validates and formats a phone number to the E.164 standard.
@@ -20,11 +43,9 @@ def validate_and_format_phone_number(phone_number: str, country_code: str = None
     Raises:
         InvalidPhoneNumberError: If the phone number is invalid.
     """
-    try:
-        parsed_number = phonenumbers.parse(phone_number, country_code)
-        if not phonenumbers.is_valid_number(parsed_number):
-            raise InvalidPhoneNumberError(f"The phone number '{phone_number}' is not valid.")
-
-        return phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
-    except NumberParseException as e:
-        raise InvalidPhoneNumberError(f"Could not parse the phone number '{phone_number}'. Reason: {e}")
+    # Stripping separators first lets differently formatted copies of the
+    # same number share one cache entry; translate() does it in one pass.
+    formatted, error = _parse_and_format(phone_number.strip().translate(_SEPARATORS), country_code)
+    if error is not None:
+        raise InvalidPhoneNumberError(error)
+    return formatted
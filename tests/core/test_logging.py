@@ -0,0 +1,37 @@
+import json
+import logging
+import queue
+import sys
+from app.core.logging import JsonFormatter, _StructuredQueueHandler
+
+def _queued_record(log_queue: queue.SimpleQueue, *args, **kwargs):
+    logger = logging.getLogger("tests.core.test_logging")
+    logger.propagate = False
+    handler = _StructuredQueueHandler(log_queue)
+    logger.addHandler(handler)
+    try:
+        logger.error(*args, **kwargs)
+    finally:
+        logger.removeHandler(handler)
+    return log_queue.get_nowait()
+
+def test_queued_exception_stays_structured():
+    """Tests that a traceback is emitted as exc_info, not inside the message."""
+    log_queue = queue.SimpleQueue()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _queued_record(log_queue, "Send failed for %s", "SM123", exc_info=sys.exc_info())
+
+    output = json.loads(JsonFormatter().format(record))
+    assert output["message"] == "Send failed for SM123"
+    assert "Traceback" in output["exc_info"]
+    assert "ValueError: boom" in output["exc_info"]
+
+def test_queued_record_without_exception():
+    log_queue = queue.SimpleQueue()
+    record = _queued_record(log_queue, "Queued %d messages", 3)
+
+    output = json.loads(JsonFormatter().format(record))
+    assert output["message"] == "Queued 3 messages"
+    assert "exc_info" not in output
@@ -1,5 +1,6 @@
 import pytest
-from app.db.models import Campaign
+from sqlalchemy import inspect
+from app.db.models import Campaign, Contact
 from datetime import datetime, timezone
 
 class TestCampaignModel:
@@ -26,3 +27,23 @@ class TestCampaignModel:
             id_agent=1
         )
         assert campaign.can_be_modified() is expected
+
+
+class TestContactModel:
+    def test_updated_at_maintained_without_reload(self, db_session):
+        """
+        Tests that an UPDATE stamps updated_at and returns it with the row, so
+        the attribute is loaded rather than expired for a later SELECT.
+        """
+        contact = Contact(nom="Stamp", prenom="Test", numero_telephone="+33612345678")
+        db_session.add(contact)
+        db_session.flush()
+        assert "updated_at" not in inspect(contact).unloaded
+
+        contact.updated_at = datetime(2000, 1, 1)
+        db_session.flush()
+        contact.nom = "Stamped"
+        db_session.flush()
+
+        assert "updated_at" not in inspect(contact).unloaded
+        assert contact.updated_at > datetime(2000, 1, 1)
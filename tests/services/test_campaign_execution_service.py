@@ -1,4 +1,6 @@
 import pytest
+from unittest.mock import patch
+from sqlalchemy import Index
 from sqlalchemy.orm import Session
 from app.services.campaign_execution_service import CampaignExecutionService
 from app.db.models import Campaign, Contact, MailingList, MessageTemplate, SMSQueue
@@ -80,3 +82,38 @@ def test_launch_campaign_invalid_requirements(db_session: Session):
     # --- Assert ---
     assert result["success"] is False
     assert "must have a template and at least one mailing list" in result["message"]
+
+@patch("app.tasks.sms_tasks.process_sms_batch.apply_async")
+def test_launch_campaign_counts_only_new_queue_items(mock_apply_async, db_session: Session, mock_draft_campaign: Campaign):
+    """Tests that a message already queued is skipped and left out of queued_count."""
+    # The dedup index comes from a migration; the test schema is built from the
+    # models. The migration keys on md5(message_content), which SQLite lacks;
+    # the raw column enforces the same uniqueness, so ON CONFLICT behaves alike.
+    Index(
+        "ux_sms_queue_dedup", SMSQueue.campaign_id, SMSQueue.contact_id, SMSQueue.message_content, unique=True
+    ).create(db_session.get_bind())
+    mailing_list = mock_draft_campaign.mailing_lists[0]
+    queued_contact = mailing_list.contacts[0]
+    mailing_list.contacts.append(Contact(nom="Second", prenom="Reader", numero_telephone="+33655667788", statut_opt_in=True))
+    db_session.add(SMSQueue(
+        campaign_id=mock_draft_campaign.id_campagne, contact_id=queued_contact.id_contact,
+        message_content="Hello Test!", scheduled_at=datetime(2025, 1, 1)
+    ))
+    db_session.commit()
+
+    result = CampaignExecutionService(db=db_session).launch_campaign(campaign_id=mock_draft_campaign.id_campagne)
+
+    assert result["queued_count"] == 1
+    assert db_session.query(SMSQueue).filter_by(campaign_id=mock_draft_campaign.id_campagne).count() == 2
+
+@patch("app.tasks.sms_tasks.process_sms_batch.apply_async")
+def test_launch_campaign_queues_contact_on_several_lists_once(mock_apply_async, db_session: Session, mock_draft_campaign: Campaign):
+    """Tests that a contact on two of the campaign's lists gets a single message."""
+    contact = mock_draft_campaign.mailing_lists[0].contacts[0]
+    mock_draft_campaign.mailing_lists.append(MailingList(nom_liste="Second List", contacts=[contact]))
+    db_session.commit()
+
+    result = CampaignExecutionService(db=db_session).launch_campaign(campaign_id=mock_draft_campaign.id_campagne)
+
+    assert result["queued_count"] == 1
+    assert db_session.query(SMSQueue).filter_by(contact_id=contact.id_contact).count() == 1
@@ -0,0 +1,71 @@
+import pytest
+from app.services.sms_providers import circuit_breaker
+from app.services.sms_providers.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.sms_providers.twilio_provider import TwilioApiError, is_twilio_outage
+
+def _fail():
+    raise ValueError("provider down")
+
+def _trip(breaker):
+    for _ in range(breaker.fail_threshold):
+        with pytest.raises(ValueError):
+            breaker.call(_fail)
+
+def test_opens_after_consecutive_failures():
+    """Tests that the circuit opens at the threshold and then rejects calls."""
+    breaker = CircuitBreaker(fail_threshold=3, reset_timeout=30)
+    _trip(breaker)
+    assert breaker.state == circuit_breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "sent")
+
+def test_success_resets_failure_count():
+    """Tests that only consecutive failures count towards the threshold."""
+    breaker = CircuitBreaker(fail_threshold=2, reset_timeout=30)
+    with pytest.raises(ValueError):
+        breaker.call(_fail)
+    assert breaker.call(lambda: "sent") == "sent"
+    with pytest.raises(ValueError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.CLOSED
+
+def test_half_open_trial_closes_or_reopens(monkeypatch):
+    """Tests the trial call made once the reset timeout has passed."""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(fail_threshold=1, reset_timeout=30)
+    _trip(breaker)
+
+    now[0] += 31
+    with pytest.raises(ValueError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+
+    now[0] += 31
+    assert breaker.call(lambda: "sent") == "sent"
+    assert breaker.state == circuit_breaker.CLOSED
+
+def test_only_outage_errors_count_as_failures():
+    """Tests that errors rejected by is_failure leave the circuit closed."""
+    breaker = CircuitBreaker(fail_threshold=2, reset_timeout=30, is_failure=is_twilio_outage)
+
+    def reject_recipient():
+        raise TwilioApiError("Invalid 'To' Phone Number", status=400)
+
+    for _ in range(5):
+        with pytest.raises(TwilioApiError):
+            breaker.call(reject_recipient)
+    assert breaker.state == circuit_breaker.CLOSED
+
+def test_is_twilio_outage():
+    """Tests which Twilio errors say the provider itself is unhealthy."""
+    assert is_twilio_outage(TwilioApiError("server error", status=503))
+    assert is_twilio_outage(TwilioApiError("too many requests", status=429))
+    assert is_twilio_outage(TwilioApiError("connection refused"))
+    assert not is_twilio_outage(TwilioApiError("unsubscribed recipient", status=400))
+    assert not is_twilio_outage(ValueError("not a provider error"))
+
+def test_breakers_are_per_provider():
+    """Tests that each provider name gets its own shared breaker."""
+    assert circuit_breaker.get_circuit_breaker("a") is circuit_breaker.get_circuit_breaker("a")
+    assert circuit_breaker.get_circuit_breaker("a") is not circuit_breaker.get_circuit_breaker("b")
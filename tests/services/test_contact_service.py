@@ -1,7 +1,9 @@
 import pytest
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from app.services import contact_service
 from app.db.models import Contact
+from app.api.v1.schemas.contact import ContactCreate, ContactUpdate
 from app.api.v1.schemas.mailing_list import ContactFilter
 
 @pytest.fixture
@@ -50,3 +52,30 @@ def test_filter_contacts_by_criteria(db_session: Session, setup_contacts):
     results = contact_service.filter_contacts_by_criteria(db_session, filters=filters)
     assert len(results) == 1
     assert results[0].nom == "Williams"
+
+
+def test_create_and_update_need_no_reload(db_session: Session):
+    """
+    Tests that create/update return a fully loaded contact without a SELECT
+    after the write: generated columns come back with the INSERT/UPDATE.
+    """
+    # The application's sessions keep state across commits
+    db = Session(bind=db_session.get_bind(), autoflush=False, expire_on_commit=False)
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0])
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        fields = dict(nom="Load", prenom="Once", numero_telephone="+33612345678", statut_opt_in=True)
+        contact = contact_service.create_contact(db, ContactCreate(**fields))
+        assert contact.id_contact and contact.created_at and contact.updated_at
+        assert statements == ["INSERT"]
+
+        statements.clear()
+        updated = contact_service.update_contact(db, contact.id_contact, ContactUpdate(**{**fields, "nom": "Loaded"}))
+        assert updated.nom == "Loaded" and updated.updated_at
+        # get_contact's lookup, then the UPDATE; nothing reloaded afterwards
+        assert statements == ["SELECT", "UPDATE"]
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+        db.close()
@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy.orm import Session
+from app.services.queue_service import SMSQueueService, MAX_SEND_ATTEMPTS
+from app.db.models import Campaign, Contact, SMSQueue
+from datetime import datetime, timedelta, timezone
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+@pytest.fixture
+def queue_target(db_session: Session):
+    """Creates a contact and a campaign for queue items to point at."""
+    contact = Contact(nom="Queue", prenom="Target", numero_telephone="+33612345678")
+    campaign = Campaign(
+        nom_campagne="Queue Campaign", statut="active",
+        date_debut=datetime(2025, 1, 1), date_fin=datetime(2025, 1, 31),
+        type_campagne="promotional", id_agent=1
+    )
+    db_session.add_all([contact, campaign])
+    db_session.commit()
+    return campaign, contact
+
+def _queue(db_session, campaign, contact, scheduled_at, content="Hello", **kwargs):
+    item = SMSQueue(
+        campaign_id=campaign.id_campagne, contact_id=contact.id_contact,
+        message_content=content, scheduled_at=scheduled_at, **kwargs
+    )
+    db_session.add(item)
+    db_session.commit()
+    return item.id
+
+def test_claim_pending_claims_due_items_in_order(db_session: Session, queue_target):
+    """Tests that only due pending items are claimed, oldest first, up to the limit."""
+    campaign, contact = queue_target
+    now = _utcnow()
+    later_id = _queue(db_session, campaign, contact, now - timedelta(minutes=1), "later")
+    first_id = _queue(db_session, campaign, contact, now - timedelta(minutes=5), "first")
+    _queue(db_session, campaign, contact, now - timedelta(minutes=2), "over limit")
+    future_id = _queue(db_session, campaign, contact, now + timedelta(hours=1), "future")
+    sent_id = _queue(db_session, campaign, contact, now - timedelta(hours=1), "done", status="sent")
+
+    items = SMSQueueService(db_session).claim_pending(2)
+    db_session.commit()
+
+    assert [item.message_content for item in items] == ["first", "over limit"]
+    assert items[0].numero_telephone == "+33612345678"
+    assert db_session.get(SMSQueue, first_id).status == "processing"
+    assert db_session.get(SMSQueue, later_id).status == "pending"
+    assert db_session.get(SMSQueue, future_id).status == "pending"
+    assert db_session.get(SMSQueue, sent_id).status == "sent"
+
+def test_claimed_items_are_not_claimed_again(db_session: Session, queue_target):
+    """Tests that a second claim doesn't return items already being processed."""
+    campaign, contact = queue_target
+    _queue(db_session, campaign, contact, _utcnow() - timedelta(minutes=1))
+    service = SMSQueueService(db_session)
+
+    assert len(service.claim_pending(10)) == 1
+    assert service.claim_pending(10) == []
+
+def test_mark_sent(db_session: Session, queue_target):
+    campaign, contact = queue_target
+    item_id = _queue(db_session, campaign, contact, _utcnow(), status="processing")
+    processed_at = datetime.now(timezone.utc)
+
+    SMSQueueService(db_session).mark_sent([{"item_id": item_id, "processed_at": processed_at}])
+    db_session.commit()
+
+    item = db_session.get(SMSQueue, item_id)
+    assert item.status == "sent"
+    assert item.processed_at is not None
+
+def test_mark_failed_retryable_requeues_with_backoff(db_session: Session, queue_target):
+    """Tests that a retryable failure goes back to pending, later, with one more attempt."""
+    campaign, contact = queue_target
+    scheduled_at = _utcnow() - timedelta(minutes=1)
+    item_id = _queue(db_session, campaign, contact, scheduled_at, status="processing")
+
+    SMSQueueService(db_session).mark_failed([{"item_id": item_id, "error": "Twilio down"}])
+    db_session.commit()
+
+    item = db_session.get(SMSQueue, item_id)
+    assert item.status == "pending"
+    assert item.attempts == 1
+    assert item.error_message == "Twilio down"
+    # The first retry waits up to two base delays (two minutes).
+    assert scheduled_at < item.scheduled_at <= _utcnow() + timedelta(minutes=2)
+
+def test_mark_failed_retryable_fails_on_last_attempt(db_session: Session, queue_target):
+    """Tests that the final allowed attempt leaves the item failed for good."""
+    campaign, contact = queue_target
+    scheduled_at = _utcnow() - timedelta(minutes=1)
+    item_id = _queue(
+        db_session, campaign, contact, scheduled_at,
+        status="processing", attempts=MAX_SEND_ATTEMPTS - 1
+    )
+
+    SMSQueueService(db_session).mark_failed([{"item_id": item_id, "error": "Twilio down"}])
+    db_session.commit()
+
+    item = db_session.get(SMSQueue, item_id)
+    assert item.status == "failed"
+    assert item.attempts == MAX_SEND_ATTEMPTS
+    assert item.scheduled_at == scheduled_at
+
+def test_mark_failed_final(db_session: Session, queue_target):
+    """Tests that a non-retryable failure is final after a single attempt."""
+    campaign, contact = queue_target
+    item_id = _queue(db_session, campaign, contact, _utcnow(), status="processing")
+
+    SMSQueueService(db_session).mark_failed([{"item_id": item_id, "error": "bad data"}], retryable=False)
+    db_session.commit()
+
+    item = db_session.get(SMSQueue, item_id)
+    assert item.status == "failed"
+    assert item.attempts == 1
+    assert item.error_message == "bad data"
+
+def test_item_queued_now_is_claimable_at_once(db_session: Session, queue_target):
+    """Tests that the due check isn't limited to whole seconds."""
+    campaign, contact = queue_target
+    _queue(db_session, campaign, contact, _utcnow())
+
+    assert len(SMSQueueService(db_session).claim_pending(10)) == 1
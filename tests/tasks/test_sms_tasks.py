@@ -1,15 +1,31 @@
+import pytest
 from unittest.mock import patch, MagicMock
+from celery.exceptions import Retry
 from sqlalchemy.orm import Session
-from app.tasks.sms_tasks import process_sms_queue, send_scheduled_campaigns
+from app.tasks import sms_tasks
+from app.tasks.sms_tasks import process_sms_batch, send_scheduled_campaigns, launch_scheduled_campaign, process_delivery_status
+from app.services.sms_providers.circuit_breaker import CircuitBreaker, OPEN, CLOSED
+from app.services.sms_providers.twilio_provider import TwilioApiError, is_twilio_outage
+from app.services.webhook_service import WebhookService
 from app.db.models import Campaign, Contact, MailingList, SMSQueue, Message
 from datetime import datetime, timedelta, timezone
 
-@patch("app.tasks.sms_tasks.CampaignExecutionService")
+@pytest.fixture(autouse=True)
+def fresh_twilio_circuit(monkeypatch):
+    """Gives each test its own closed circuit instead of the worker-wide one."""
+    circuit = CircuitBreaker(is_failure=is_twilio_outage)
+    monkeypatch.setattr(sms_tasks, "twilio_circuit", circuit)
+    return circuit
+
+def _due():
+    """A scheduled_at that is already due."""
+    return datetime.now(timezone.utc) - timedelta(minutes=1)
+
+@patch("app.tasks.sms_tasks.group")
 @patch("app.tasks.sms_tasks.SessionLocal")
-def test_send_scheduled_campaigns(MockSessionLocal, MockExecutionService, db_session: Session):
+def test_send_scheduled_campaigns(MockSessionLocal, mock_group, db_session: Session):
     # --- Setup ---
     MockSessionLocal.return_value = db_session
-    mock_service_instance = MockExecutionService.return_value
 
     # Create a campaign that is scheduled and ready to be launched
     scheduled_campaign = Campaign(
@@ -19,20 +35,42 @@ def test_send_scheduled_campaigns(MockSessionLocal, MockExecutionService, db_ses
         date_fin=datetime.now(timezone.utc) + timedelta(days=1),
         type_campagne="promotional", id_agent=1
     )
-    db_session.add(scheduled_campaign)
+    # And one that isn't due yet
+    future_campaign = Campaign(
+        nom_campagne="Future Campaign",
+        statut="scheduled",
+        date_debut=datetime.now(timezone.utc) + timedelta(hours=1),
+        date_fin=datetime.now(timezone.utc) + timedelta(days=1),
+        type_campagne="promotional", id_agent=1
+    )
+    db_session.add_all([scheduled_campaign, future_campaign])
     db_session.commit()
+    campaign_id = scheduled_campaign.id_campagne
 
     # --- Execute ---
     send_scheduled_campaigns()
 
     # --- Assert ---
-    # Verify that the launch method was called for the scheduled campaign
-    mock_service_instance.launch_campaign.assert_called_once_with(scheduled_campaign.id_campagne)
+    # Verify that one launch task was dispatched, for the due campaign only
+    launches = list(mock_group.call_args.args[0])
+    assert [launch.args for launch in launches] == [(campaign_id,)]
+    assert launches[0].task == launch_scheduled_campaign.name
+    mock_group.return_value.apply_async.assert_called_once()
+
+
+@patch("app.tasks.sms_tasks.CampaignExecutionService")
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_launch_scheduled_campaign(MockSessionLocal, MockExecutionService, db_session: Session):
+    MockSessionLocal.return_value = db_session
+
+    launch_scheduled_campaign(42)
+
+    MockExecutionService.return_value.launch_campaign.assert_called_once_with(42)
 
 
 @patch("app.tasks.sms_tasks.SessionLocal")
 @patch("app.tasks.sms_tasks.TwilioProvider")
-def test_process_sms_queue_success(MockTwilioProvider, MockSessionLocal, db_session: Session):
+def test_process_sms_batch_success(MockTwilioProvider, MockSessionLocal, db_session: Session):
     # --- Setup ---
     MockSessionLocal.return_value = db_session
     mock_provider_instance = MockTwilioProvider.return_value
@@ -46,13 +84,13 @@ def test_process_sms_queue_success(MockTwilioProvider, MockSessionLocal, db_sess
     db_session.commit()
     contact_id = contact.id_contact
 
-    queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact_id, message_content="Go", scheduled_at=datetime.now(timezone.utc))
+    queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact_id, message_content="Go", scheduled_at=_due())
     db_session.add(queue_item)
     db_session.commit()
     queue_item_id = queue_item.id
 
     # --- Execute ---
-    process_sms_queue()
+    process_sms_batch()
 
     # --- Assert ---
     processed_item = db_session.get(SMSQueue, queue_item_id)
@@ -67,7 +105,7 @@ def test_process_sms_queue_success(MockTwilioProvider, MockSessionLocal, db_sess
 
 @patch("app.tasks.sms_tasks.SessionLocal")
 @patch("app.tasks.sms_tasks.TwilioProvider")
-def test_process_sms_queue_failure_and_retry(MockTwilioProvider, MockSessionLocal, db_session: Session):
+def test_process_sms_batch_failure_and_retry(MockTwilioProvider, MockSessionLocal, db_session: Session):
     # --- Setup ---
     MockSessionLocal.return_value = db_session
     from app.services.sms_providers.twilio_provider import TwilioApiError
@@ -81,13 +119,13 @@ def test_process_sms_queue_failure_and_retry(MockTwilioProvider, MockSessionLoca
     db_session.commit()
     contact_id = contact.id_contact
 
-    queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact_id, message_content="Fail", scheduled_at=datetime.now(timezone.utc))
+    queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact_id, message_content="Fail", scheduled_at=_due())
     db_session.add(queue_item)
     db_session.commit()
     queue_item_id = queue_item.id
 
     # --- Execute ---
-    process_sms_queue()
+    process_sms_batch()
 
     # --- Assert ---
     processed_item = db_session.get(SMSQueue, queue_item_id)
@@ -96,13 +134,12 @@ def test_process_sms_queue_failure_and_retry(MockTwilioProvider, MockSessionLoca
     assert "Test API Error" in processed_item.error_message
 
 
-@patch("app.tasks.sms_tasks.settings")
+@patch("app.tasks.sms_tasks.SMS_BATCH_SIZE", 5)
 @patch("app.tasks.sms_tasks.SessionLocal")
 @patch("app.tasks.sms_tasks.TwilioProvider")
-def test_process_sms_queue_respects_rate_limit(MockTwilioProvider, MockSessionLocal, mock_settings, db_session: Session):
+def test_process_sms_batch_respects_rate_limit(MockTwilioProvider, MockSessionLocal, db_session: Session):
     # --- Setup ---
-    # Configure the rate limit via the mocked settings
-    mock_settings.SMS_RATE_LIMIT = "5"
+    # The batch size is parsed from SMS_RATE_LIMIT when the module loads
 
     MockSessionLocal.return_value = db_session
     mock_provider_instance = MockTwilioProvider.return_value
@@ -119,13 +156,207 @@ def test_process_sms_queue_respects_rate_limit(MockTwilioProvider, MockSessionLo
 
     # Create 10 items in the queue
     for i in range(10):
-        queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact.id_contact, message_content=f"Msg {i}", scheduled_at=datetime.now(timezone.utc))
+        queue_item = SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact.id_contact, message_content=f"Msg {i}", scheduled_at=_due())
         db_session.add(queue_item)
     db_session.commit()
 
     # --- Execute ---
-    process_sms_queue()
+    process_sms_batch()
 
     # --- Assert ---
     # Verify that send_sms was called exactly 5 times, respecting the rate limit
     assert mock_provider_instance.send_sms.call_count == 5
+
+
+def _queue_items(db_session, count, phone_prefix="+3361122334"):
+    """Queues `count` due items, each for its own contact, and returns their ids."""
+    campaign = Campaign(nom_campagne="Circuit Campaign", date_debut=datetime.now(timezone.utc), date_fin=datetime.now(timezone.utc), statut="active", type_campagne="promotional", id_agent=1)
+    contacts = [Contact(nom=f"Circuit{i}", prenom="Test", numero_telephone=f"{phone_prefix}{i}") for i in range(count)]
+    mailing_list = MailingList(nom_liste="Circuit List", campaign=campaign, contacts=contacts)
+    db_session.add_all([campaign, mailing_list, *contacts])
+    db_session.commit()
+    items = [
+        SMSQueue(campaign_id=campaign.id_campagne, contact_id=contact.id_contact, message_content="Hi", scheduled_at=_due())
+        for contact in contacts
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    return [item.id for item in items]
+
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+@patch("app.tasks.sms_tasks.TwilioProvider")
+def test_process_sms_batch_defers_items_while_circuit_open(MockTwilioProvider, MockSessionLocal, fresh_twilio_circuit, db_session: Session):
+    # --- Setup ---
+    MockSessionLocal.return_value = db_session
+    mock_provider_instance = MockTwilioProvider.return_value
+    mock_provider_instance.send_sms.side_effect = TwilioApiError("Twilio unavailable", status=503)
+    item_ids = _queue_items(db_session, 5)
+
+    # --- Execute ---
+    # One send at a time, so exactly three go out before the circuit opens
+    with patch.object(sms_tasks.settings, "SMS_SEND_CONCURRENCY", 1):
+        process_sms_batch()
+
+    # --- Assert ---
+    # The circuit opened after three outage errors; the rest were never sent
+    assert fresh_twilio_circuit.state == OPEN
+    assert mock_provider_instance.send_sms.call_count == 3
+
+    items = [db_session.get(SMSQueue, item_id) for item_id in item_ids]
+    attempted, skipped = items[:3], items[3:]
+    assert all(item.status == "pending" and item.attempts == 1 for item in attempted)
+    # Skipped items wait for the circuit without using up an attempt
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for item in skipped:
+        assert item.status == "pending"
+        assert item.attempts == 0
+        assert "circuit is open" in item.error_message
+        assert item.scheduled_at >= now + timedelta(seconds=fresh_twilio_circuit.reset_timeout - 5)
+
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+@patch("app.tasks.sms_tasks.TwilioProvider")
+def test_process_sms_batch_recipient_errors_keep_circuit_closed(MockTwilioProvider, MockSessionLocal, fresh_twilio_circuit, db_session: Session):
+    # --- Setup ---
+    MockSessionLocal.return_value = db_session
+    mock_provider_instance = MockTwilioProvider.return_value
+    # e.g. Twilio error 21211: invalid 'To' number
+    mock_provider_instance.send_sms.side_effect = TwilioApiError("Invalid 'To' Phone Number", status=400)
+    item_ids = _queue_items(db_session, 5)
+
+    # --- Execute ---
+    process_sms_batch()
+
+    # --- Assert ---
+    assert fresh_twilio_circuit.state == CLOSED
+    assert mock_provider_instance.send_sms.call_count == 5
+    assert all(db_session.get(SMSQueue, item_id).attempts == 1 for item_id in item_ids)
+
+
+@pytest.fixture
+def seen_statuses():
+    """Stands in for Redis behind the delivery-status dedup."""
+    seen = set()
+    def cache_add(key, ttl):
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+    with patch("app.services.webhook_service.cache_add", side_effect=cache_add), \
+         patch("app.services.webhook_service.cache_delete", side_effect=seen.discard):
+        yield seen
+
+@pytest.fixture
+def sent_message(db_session: Session):
+    """Creates a sent message with a Twilio SID for status callbacks to update."""
+    contact = Contact(nom="Status", prenom="Hook", numero_telephone="+33712345679")
+    campaign = Campaign(nom_campagne="Status Campaign", date_debut=datetime(2025, 1, 1), date_fin=datetime(2025, 1, 31), statut="active", type_campagne="promotional", id_agent=1)
+    mailing_list = MailingList(nom_liste="Status List", campaign=campaign, contacts=[contact])
+    message = Message(
+        contenu="Hi", date_envoi=datetime(2025, 1, 1), statut_livraison="sent", identifiant_expediteur="+15005550006",
+        external_message_id="SM_STATUS", mailing_list=mailing_list, contact=contact, campaign=campaign
+    )
+    db_session.add_all([contact, campaign, mailing_list, message])
+    db_session.commit()
+    return message.id_message
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_updates_message(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    MockSessionLocal.return_value = db_session
+
+    process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "undelivered", "ErrorMessage": "Unreachable", "Price": "-0.0075"})
+
+    message = db_session.get(Message, sent_message)
+    assert message.statut_livraison == "failed"
+    assert message.error_message == "Unreachable"
+    assert float(message.cost) == 0.0075
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_ignores_repeats(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that a callback Twilio sends again is only applied once."""
+    MockSessionLocal.return_value = db_session
+    payload = {"MessageSid": "SM_STATUS", "MessageStatus": "delivered"}
+    process_delivery_status(payload)
+
+    with patch.object(WebhookService, "handle_delivery_status") as mock_handle:
+        process_delivery_status(payload)
+        mock_handle.assert_not_called()
+        # A new status for the same message is not a repeat.
+        process_delivery_status({**payload, "MessageStatus": "failed"})
+        mock_handle.assert_called_once()
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_missing_fields(MockSessionLocal, seen_statuses):
+    process_delivery_status({"MessageSid": "SM_STATUS"})
+
+    MockSessionLocal.assert_not_called()
+    assert seen_statuses == set()
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_malformed_price(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that an unparseable Price is skipped while the status is still applied."""
+    MockSessionLocal.return_value = db_session
+
+    process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "delivered", "Price": "n/a"})
+
+    message = db_session.get(Message, sent_message)
+    assert message.statut_livraison == "delivered"
+    assert message.cost is None
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_failed_update_allows_redelivery(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that a callback whose update failed isn't treated as a repeat next time."""
+    MockSessionLocal.return_value = db_session
+    payload = {"MessageSid": "SM_STATUS", "MessageStatus": "delivered"}
+
+    with patch.object(WebhookService, "handle_delivery_status", side_effect=RuntimeError("database down")):
+        with pytest.raises(RuntimeError):
+            process_delivery_status(payload)
+    assert seen_statuses == set()
+
+    process_delivery_status(payload)
+    assert db_session.get(Message, sent_message).statut_livraison == "delivered"
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_retries_before_message_recorded(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that a callback arriving before its message record is retried, not dropped."""
+    MockSessionLocal.return_value = db_session
+    payload = {"MessageSid": "SM_EARLY", "MessageStatus": "delivered"}
+
+    with patch.object(process_delivery_status, "retry", side_effect=Retry()) as mock_retry:
+        with pytest.raises(Retry):
+            process_delivery_status(payload)
+    mock_retry.assert_called_once_with(countdown=sms_tasks.UNKNOWN_SID_RETRY_DELAY)
+    assert seen_statuses == set()
+
+    # The batch commits its message records, then the retry runs.
+    db_session.get(Message, sent_message).external_message_id = "SM_EARLY"
+    db_session.commit()
+    process_delivery_status(payload)
+
+    assert db_session.get(Message, sent_message).statut_livraison == "delivered"
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_never_downgrades_final_status(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that a late 'sent' callback doesn't undo 'delivered', and isn't retried as unknown."""
+    MockSessionLocal.return_value = db_session
+
+    process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "delivered"})
+    with patch.object(process_delivery_status, "retry") as mock_retry:
+        process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "sent"})
+    mock_retry.assert_not_called()
+
+    assert db_session.get(Message, sent_message).statut_livraison == "delivered"
+
+@patch("app.tasks.sms_tasks.SessionLocal")
+def test_process_delivery_status_in_order(MockSessionLocal, seen_statuses, sent_message, db_session: Session):
+    """Tests that callbacks arriving in order move the message on to its final status."""
+    MockSessionLocal.return_value = db_session
+
+    process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "sending"})
+    process_delivery_status({"MessageSid": "SM_STATUS", "MessageStatus": "undelivered", "ErrorMessage": "Unreachable"})
+
+    message = db_session.get(Message, sent_message)
+    assert message.statut_livraison == "failed"
+    assert message.error_message == "Unreachable"